@@ -0,0 +1,88 @@
+"""
+Compare png encoding profiles on rendered forecast images.
+
+Also resizes every profile to a camera thumbnail and compares it with the
+thumbnail of the default profile, exits 1 when a profile differs too much.
+
+"""
+import argparse
+import io
+import sys
+
+from PIL import Image, ImageChops, ImageStat
+
+from common import api, get_intervals, load_client, measure, print_table
+
+# Mean difference per channel, 0-255, allowed between a thumbnail of a
+# profile and one of the default profile. Palette rounding stays near 1,
+# nearest neighbour resizing of a palette image is about 8.
+THUMBNAIL_MAX_DIFFERENCE = 2.0
+THUMBNAIL_WIDTH = 400
+
+
+def render_image(client, qty):
+    intervals = get_intervals(client, qty + 1)
+    columns = client.get_image_columns(intervals, qty)
+    return api.image_create_strip(columns, api.get_text_atlas())
+
+
+def get_thumbnail(image, profile):
+    variant = api.image_create_variant(
+        api.image_encode_png(image, profile), width=THUMBNAIL_WIDTH
+    )
+    with Image.open(io.BytesIO(variant)) as thumbnail:
+        return thumbnail.convert("RGB")
+
+
+def get_difference(image, other):
+    """Mean absolute difference over the channels of two images."""
+    mean = ImageStat.Stat(ImageChops.difference(image, other)).mean
+    return sum(mean) / len(mean)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Png encoding benchmark")
+    parser.add_argument(
+        "payloads",
+        help="Recorded locationforecast payloads, default fixtures/oslo.json",
+        nargs="*",
+        default=["oslo.json"],
+    )
+    parser.add_argument("-q", "--qty", help="Forecast columns", default=6, type=int)
+    parser.add_argument("-r", "--repeat", help="Repetitions", default=10, type=int)
+    args = parser.parse_args()
+
+    api.WEATHER_ICONS.prewarm()
+    rows = []
+    failures = []
+    for payload in args.payloads:
+        image = render_image(load_client(payload), args.qty)
+        reference = get_thumbnail(image, "default")
+        for profile in api.CONST_PNG_PROFILES:
+            timing = measure(
+                lambda: api.image_encode_png(image, profile), repeat=args.repeat
+            )
+            size = len(api.image_encode_png(image, profile))
+            difference = round(get_difference(reference, get_thumbnail(image, profile)), 2)
+            if difference > THUMBNAIL_MAX_DIFFERENCE:
+                failures.append(f"{payload} {profile}: thumbnail differs by {difference}")
+            rows.append(
+                {
+                    "payload": payload,
+                    "profile": profile,
+                    "bytes": size,
+                    **timing,
+                    "thumbnail": difference,
+                }
+            )
+        image.close()
+
+    print(f"Png encode time per image ({args.qty} columns), ms")
+    print_table(rows, ["payload", "profile", "bytes", "min", "median", "mean", "thumbnail"])
+    if failures:
+        print("\n" + "\n".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
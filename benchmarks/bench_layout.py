@@ -0,0 +1,85 @@
+"""
+Compare pairwise image combining with the single canvas strip layout.
+
+Each case runs in its own process so peak memory (ru_maxrss) is not
+shared between cases. Linux reports ru_maxrss in KiB.
+
+"""
+import argparse
+import functools
+import multiprocessing
+import resource
+import time
+
+from common import api, get_intervals, load_client, print_table
+
+
+def get_columns(count):
+    client = load_client()
+    intervals = get_intervals(client, count)
+    return client.get_image_columns(intervals, count)
+
+
+def render_pairwise(columns, font):
+    images = [api.image_create(imagedata, font) for imagedata in columns]
+    return functools.reduce(api.image_combine_right, images)
+
+
+def render_strip(columns, font):
+    return api.image_create_strip(columns, font)
+
+
+def get_rss_kib():
+    with open("/proc/self/statm", "r") as file:
+        return int(file.read().split()[1]) * resource.getpagesize() // 1024
+
+
+def run_case(method, count, repeat, queue):
+    columns = get_columns(count)
+    font = api.get_text_atlas()
+    api.WEATHER_ICONS.prewarm()
+    render = render_pairwise if method == "pairwise" else render_strip
+    render(columns[:2], font).close()
+
+    rss_before = get_rss_kib()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render(columns, font).close()
+        samples.append((time.perf_counter() - start) * 1000)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put(
+        {
+            "method": method,
+            "columns": len(columns) - 1,
+            "median_ms": round(sorted(samples)[len(samples) // 2], 2),
+            "peak_delta_kib": max(0, peak - rss_before),
+        }
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Image layout benchmark")
+    parser.add_argument("-r", "--repeat", help="Repetitions", default=10, type=int)
+    parser.add_argument(
+        "-c", "--columns", help="Column counts", default=[6, 24, 48], nargs="+", type=int
+    )
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    rows = []
+    for count in args.columns:
+        for method in ["pairwise", "strip"]:
+            queue = context.Queue()
+            process = context.Process(
+                target=run_case, args=(method, count, args.repeat, queue)
+            )
+            process.start()
+            rows.append(queue.get())
+            process.join()
+
+    print_table(rows, ["method", "columns", "median_ms", "peak_delta_kib"])
+
+
+if __name__ == "__main__":
+    main()
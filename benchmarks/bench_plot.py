@@ -0,0 +1,52 @@
+"""
+Compare the pyplot chart with the reused Agg figure, time and memory.
+
+"""
+import argparse
+import gc
+import os
+import resource
+import tempfile
+
+from common import api, get_intervals, load_client, measure, print_table
+
+
+def get_rss_mib():
+    """Current resident set size, from /proc where available."""
+    try:
+        with open("/proc/self/statm", "r") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Forecast chart benchmark")
+    parser.add_argument("-r", "--repeat", help="Repetitions", default=50, type=int)
+    args = parser.parse_args()
+
+    client = load_client()
+    intervals = get_intervals(client, 10)
+    filename = os.path.join(tempfile.mkdtemp(), "plot.png")
+    plot = api.WeatherPlot()
+
+    renderers = {
+        "pyplot": lambda: api.plot_weatherdata(intervals, filename, location_name="Oslo"),
+        "agg_reused": lambda: plot.render(intervals, "Oslo", client.location.units),
+    }
+    rows = []
+    for name, func in renderers.items():
+        gc.collect()
+        before = get_rss_mib()
+        timing = measure(func, repeat=args.repeat)
+        gc.collect()
+        rows.append(
+            {"renderer": name, **timing, "rss_growth_mib": round(get_rss_mib() - before, 1)}
+        )
+
+    print(f"Chart render time, ms, {args.repeat} renders")
+    print_table(rows, ["renderer", "min", "median", "mean", "rss_growth_mib"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Compare image rendering throughput on threads and on worker processes.
+
+"""
+import argparse
+import concurrent.futures
+import os
+import time
+
+from common import api, get_intervals, load_client, print_table
+
+
+def get_jobs(count, qty):
+    """Column sets of count locations, each with its own legend."""
+    client = load_client()
+    intervals = get_intervals(client, qty + 1)
+    jobs = []
+    for i in range(count):
+        client.location.name = f"Location {i}"
+        jobs.append(client.get_image_columns(intervals, qty))
+    return jobs
+
+
+def run(submit, jobs, profile):
+    """Render all jobs without column tiles, return rows of the result table."""
+    start = time.perf_counter()
+    futures = [submit(columns, profile, False) for columns in jobs]
+    size = sum(len(future.result()) for future in futures)
+    seconds = time.perf_counter() - start
+    return {
+        "seconds": round(seconds, 3),
+        "images/s": round(len(jobs) / seconds, 1),
+        "bytes": size,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render pool scaling benchmark")
+    parser.add_argument("-n", "--locations", help="Images per run", default=48, type=int)
+    parser.add_argument("-q", "--qty", help="Forecast columns", default=6, type=int)
+    parser.add_argument(
+        "-w", "--workers", help="Max workers", default=os.cpu_count() or 1, type=int
+    )
+    parser.add_argument("--profile", help="Png profile", default="default")
+    args = parser.parse_args()
+
+    jobs = get_jobs(args.locations, args.qty)
+    api.init_render_worker()
+    rows = []
+    for workers in range(1, args.workers + 1):
+        with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+
+            def submit(*args):
+                return executor.submit(api.render_columns_png, *args)
+
+            run(submit, jobs[:workers], args.profile)
+            result = run(submit, jobs, args.profile)
+        rows.append({"backend": "threads", "workers": workers, **result})
+
+        pool = api.ProcessRenderPool(workers)
+        # Start the workers and load icons and fonts before timing
+        run(pool.submit, jobs[:workers], args.profile)
+        result = run(pool.submit, jobs, args.profile)
+        pool.close()
+        rows.append({"backend": "processes", "workers": workers, **result})
+
+    print(f"Rendering {len(jobs)} images of {args.qty} columns, {os.cpu_count()} cpus")
+    print_table(rows, ["backend", "workers", "seconds", "images/s", "bytes"])
+
+
+if __name__ == "__main__":
+    main()
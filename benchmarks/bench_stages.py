@@ -0,0 +1,261 @@
+"""
+Time every stage of the pipeline on recorded payloads, compare the fastest
+runs with baselines.json and check rendered images against golden/.
+
+    python benchmarks/bench_stages.py             # exit 1 on regression or changed output
+    python benchmarks/bench_stages.py --update    # record baselines and golden images
+
+Baselines depend on the machine. A short calibration loop is stored with
+them and timings are scaled by it, but record them again on the machine
+that runs the comparison. The entity stage needs Home Assistant, the run
+fails without it. A stage without a baseline fails too.
+
+"""
+import argparse
+import asyncio
+import gc
+import hashlib
+import json
+import logging
+import os
+import sys
+from types import SimpleNamespace
+
+from PIL import Image, ImageChops
+
+from common import DIR_BENCHMARKS, api, get_intervals, load_client, measure, print_table
+
+FILE_BASELINES = os.path.join(DIR_BENCHMARKS, "baselines.json")
+DIR_GOLDEN = os.path.join(DIR_BENCHMARKS, "golden")
+
+# Relative slowdown allowed before a stage fails, and an absolute floor in
+# milliseconds below which differences are timer noise
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_MIN_MS = 0.2
+
+
+def calibrate():
+    """Fastest run of a fixed pure python workload, the speed of this machine."""
+    return measure(lambda: sum(i * i for i in range(100000)), repeat=30, warmup=2)["min"]
+
+
+def measure_stage(func, repeat):
+    """Fastest run of func with the garbage collector paused, like timeit."""
+    gc.collect()
+    gc.disable()
+    try:
+        return measure(func, repeat=repeat, warmup=2)["min"]
+    finally:
+        gc.enable()
+
+
+def get_entity_stage(client, loop):
+    """State and attributes of all sensor entities, needs Home Assistant."""
+    sys.path.insert(0, os.path.join(DIR_BENCHMARKS, ".."))
+    try:
+        from custom_components.norwegianweather import entity
+        from custom_components.norwegianweather.const import ENTITIES
+    except (ImportError, AttributeError) as e:
+        raise SystemExit(f"The entity stage needs Home Assistant: {e!r}")
+    # Refresh time and timings come from the coordinator, not the payload
+    logging.getLogger(entity.__package__).setLevel(logging.ERROR)
+
+    coordinator = SimpleNamespace(data=client.data, entity_ids={})
+    entities = []
+    for key, data in ENTITIES.items():
+        if data.get("type", "sensor") not in ("sensor", "binary_sensor"):
+            continue
+        entities.append(
+            entity.NorwegianWeatherEntity(
+                coordinator,
+                None,
+                client.location.name,
+                key,
+                data["key"],
+                data["units"],
+                entity.convert_units_funcs.get(data["convert_units_func"], None),
+                data["attrs"],
+                data["device_class"],
+                data["icon"],
+                state_func=data.get("state_func", None),
+            )
+        )
+
+    async def update_entities():
+        for item in entities:
+            await item.async_update()
+            item.state_attributes
+
+    return lambda: loop.run_until_complete(update_entities())
+
+
+def get_stages(payload, qty):
+    """Stage functions on a client with payload, all working on the same data."""
+    client = load_client(payload)
+    client.demand_image = False
+    series_count = len(client._raw_timeseries)
+    intervals = get_intervals(client, series_count)
+    columns = client.get_image_columns(intervals, qty)
+    font = api.get_text_atlas()
+    strip = api.image_create_strip(columns, font)
+    column_images = [api.image_create(data, font) for data in columns]
+    now = api.get_payload_time(client.yrdata)
+    times = [serie.time for serie in client.location.time_series[: qty * 8]]
+    speeds = [i / 10 for i in range(400)]
+    loop = asyncio.new_event_loop()
+
+    def build_time_series():
+        client.location.time_series = []
+        client.ensure_time_series(series_count)
+
+    def process():
+        client.generation += 1
+        api.set_simulated_now(now)
+        try:
+            loop.run_until_complete(client.process_data())
+        finally:
+            api.set_simulated_now(None)
+
+    stages = {
+        "parse": client.parse_data,
+        "timeserie": build_time_series,
+        "derive": lambda: [s.get_intervals_hourly_data() for s in client.location.time_series],
+        "lookup": lambda: [client.location.get_timeserie_time_hourlydata(t) for t in times],
+        "beaufort": lambda: [api.get_wind_ms_beaufort(speed) for speed in speeds],
+        "process": process,
+        "columns": lambda: client.get_image_columns(intervals, qty),
+        "image_create": lambda: [api.image_create(data, font) for data in columns],
+        "image_list_combine": lambda: api.image_list_combine(column_images),
+        "render": lambda: api.image_create_strip(columns, font),
+        "encode": lambda: api.image_encode_png(strip),
+        "svg": lambda: api.image_create_svg(columns),
+    }
+    # Entities read the data of the last process_data
+    process()
+    stages["entity"] = get_entity_stage(client, loop)
+    outputs = {"strip.png": strip, "strip.svg": api.image_create_svg(columns).encode("utf-8")}
+    return stages, outputs
+
+
+def get_golden_path(payload, name):
+    return os.path.join(DIR_GOLDEN, f"{payload.split('.')[0]}_{name}")
+
+
+def check_golden(payload, outputs, update):
+    """Compare outputs with the golden files, or write them, return failures."""
+    failures = []
+    for name, output in outputs.items():
+        filename = get_golden_path(payload, name)
+        if update:
+            os.makedirs(DIR_GOLDEN, exist_ok=True)
+            if isinstance(output, Image.Image):
+                output.save(filename, format="PNG")
+            else:
+                with open(filename, "wb") as file:
+                    file.write(output)
+            continue
+        if not os.path.exists(filename):
+            failures.append(f"{name}: no golden file, run with --update")
+        elif isinstance(output, Image.Image):
+            with Image.open(filename) as golden:
+                golden = golden.convert(output.mode)
+                if golden.size != output.size:
+                    failures.append(f"{name}: size {output.size} != {golden.size}")
+                elif ImageChops.difference(golden, output).getbbox() is not None:
+                    failures.append(f"{name}: pixels differ from golden image")
+        else:
+            with open(filename, "rb") as file:
+                golden = file.read()
+            if hashlib.sha1(golden).digest() != hashlib.sha1(output).digest():
+                failures.append(f"{name}: differs from golden file")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline stage regression benchmark")
+    parser.add_argument(
+        "payloads",
+        help="Recorded locationforecast payloads, default fixtures/oslo.json",
+        nargs="*",
+        default=["oslo.json"],
+    )
+    parser.add_argument("-q", "--qty", help="Forecast columns", default=6, type=int)
+    parser.add_argument("-r", "--repeat", help="Repetitions per round", default=10, type=int)
+    parser.add_argument("--rounds", help="Rounds over all stages", default=5, type=int)
+    parser.add_argument(
+        "-t",
+        "--threshold",
+        help="Allowed slowdown, 0.25 is 25%%",
+        default=DEFAULT_THRESHOLD,
+        type=float,
+    )
+    parser.add_argument(
+        "--min-ms", help="Ignore differences below", default=DEFAULT_MIN_MS, type=float
+    )
+    parser.add_argument(
+        "--update", help="Record baselines and golden images", action="store_true"
+    )
+    args = parser.parse_args()
+
+    api.WEATHER_ICONS.prewarm()
+    calibration = calibrate()
+    results = {}
+    failures = []
+    for payload in args.payloads:
+        stages, outputs = get_stages(payload, args.qty)
+        # Rounds over all stages spread a slow spell of the machine over all
+        # of them, the fastest run is the least disturbed by other load
+        results[payload] = {}
+        for _ in range(max(1, args.rounds)):
+            calibration = min(calibration, calibrate())
+            for stage, func in stages.items():
+                fastest = measure_stage(func, args.repeat)
+                results[payload][stage] = min(fastest, results[payload].get(stage, fastest))
+        for failure in check_golden(payload, outputs, args.update):
+            failures.append(f"{payload} {failure}")
+
+    if args.update:
+        with open(FILE_BASELINES, "w") as file:
+            json.dump({"calibration_ms": calibration, "payloads": results}, file, indent=2)
+            file.write("\n")
+        print(f"Recorded baselines in {FILE_BASELINES} and golden files in {DIR_GOLDEN}")
+        return
+
+    try:
+        with open(FILE_BASELINES, "r") as file:
+            baselines = json.load(file)
+    except FileNotFoundError:
+        baselines = {"calibration_ms": calibration, "payloads": {}}
+    scale = calibration / baselines["calibration_ms"]
+
+    rows = []
+    for payload, stages in results.items():
+        for stage, fastest in stages.items():
+            baseline = baselines["payloads"].get(payload, {}).get(stage, None)
+            row = {"payload": payload, "stage": stage, "min ms": fastest}
+            if baseline is None:
+                row["result"] = "NEW"
+                failures.append(f"{payload} {stage}: no baseline, run with --update")
+            else:
+                expected = baseline * scale
+                row["baseline ms"] = round(expected, 3)
+                row["change"] = f"{(fastest / expected - 1) * 100 if expected else 0:+.0f}%"
+                slower = fastest > expected * (1 + args.threshold)
+                if slower and fastest - expected > args.min_ms:
+                    row["result"] = "SLOWER"
+                    failures.append(
+                        f"{payload} {stage}: {fastest} ms, baseline {row['baseline ms']} ms"
+                    )
+                else:
+                    row["result"] = "ok"
+            rows.append(row)
+
+    print(f"Calibration {calibration} ms, baseline {baselines['calibration_ms']} ms (scale {scale:.2f})")
+    print_table(rows, ["payload", "stage", "min ms", "baseline ms", "change", "result"])
+    if failures:
+        print("\n" + "\n".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Compare the svg forecast strip with the rendered and encoded png strip.
+
+"""
+import argparse
+
+from common import api, get_intervals, load_client, measure, print_table
+
+
+def render_png(columns):
+    image = api.image_create_strip(columns, api.get_text_atlas())
+    try:
+        return api.image_encode_png(image)
+    finally:
+        image.close()
+
+
+def render_svg(columns):
+    return api.image_create_svg(columns).encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Svg backend benchmark")
+    parser.add_argument("-r", "--repeat", help="Repetitions", default=10, type=int)
+    args = parser.parse_args()
+
+    client = load_client()
+    api.WEATHER_ICONS.prewarm()
+    rows = []
+    for qty in (6, 24, 48):
+        intervals = get_intervals(client, qty + 1)
+        columns = client.get_image_columns(intervals, qty)
+        for backend, func in (("png", render_png), ("svg", render_svg)):
+            timing = measure(lambda: func(columns), repeat=args.repeat)
+            size = len(func(columns))
+            rows.append({"columns": qty, "backend": backend, "bytes": size, **timing})
+
+    print("Render and encode time per strip, ms")
+    print_table(rows, ["columns", "backend", "bytes", "min", "median", "mean"])
+
+
+if __name__ == "__main__":
+    main()
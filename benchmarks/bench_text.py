@@ -0,0 +1,45 @@
+"""
+Compare text drawing through FreeType with the cached text atlas.
+
+"""
+import argparse
+
+from common import api, get_intervals, load_client, measure, print_table
+
+
+def render_columns(client, intervals, font):
+    for data in intervals:
+        imagedata = api.image_create_process_data(
+            data.get("time"), data, client.location.units
+        )
+        api.image_create(imagedata, font).close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Text rendering benchmark")
+    parser.add_argument("-r", "--repeat", help="Repetitions", default=20, type=int)
+    args = parser.parse_args()
+
+    client = load_client()
+    intervals = get_intervals(client, 7)
+    api.WEATHER_ICONS.prewarm()
+
+    rows = []
+    freetype = measure(
+        lambda: render_columns(client, intervals, api.weatherimage_font()),
+        repeat=args.repeat,
+    )
+    rows.append({"renderer": "freetype", **freetype})
+    atlas = measure(
+        lambda: render_columns(client, intervals, api.get_text_atlas()),
+        repeat=args.repeat,
+    )
+    rows.append({"renderer": "atlas", **atlas})
+
+    print(f"Render time per image ({len(intervals)} columns), ms")
+    print_table(rows, ["renderer", "min", "median", "mean"])
+    print(f"Atlas: {api.get_text_atlas().stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Shared helpers for the NorwegianWeather benchmark scripts.
+
+Run the scripts from the repository root, e.g. python benchmarks/bench_text.py.
+The fixture in fixtures/ is a locationforecast/2.0 complete payload.
+
+"""
+import json
+import os
+import statistics
+import sys
+import time
+
+DIR_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+DIR_FIXTURES = os.path.join(DIR_BENCHMARKS, "fixtures")
+DIR_INTEGRATION = os.path.abspath(
+    os.path.join(DIR_BENCHMARKS, "..", "custom_components", "norwegianweather")
+)
+
+sys.path.insert(0, DIR_INTEGRATION)
+import api  # noqa: E402
+
+
+def load_payload(name="oslo.json"):
+    with open(os.path.join(DIR_FIXTURES, name), "r") as file:
+        return json.load(file)
+
+
+def load_client(name="oslo.json", place="Oslo", output_dir=None):
+    """Return an API client with the fixture parsed, without network."""
+    client = api.NorwegianWeatherApiClient(
+        place, 59.9133, 10.7389, None, output_dir=output_dir or DIR_BENCHMARKS
+    )
+    client.set_cache({"yrdata": load_payload(name)})
+    client.parse_data()
+    client._parsed_generation = client.generation
+    return client
+
+
+def get_intervals(client, count=10):
+    client.ensure_time_series(count)
+    return [serie.get_intervals_hourly_data() for serie in client.location.time_series[:count]]
+
+
+def measure(func, repeat=10, warmup=1):
+    """Call func repeatedly and return timings in milliseconds."""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "min": round(min(samples), 3),
+        "median": round(statistics.median(samples), 3),
+        "mean": round(statistics.mean(samples), 3),
+    }
+
+
+def print_table(rows, columns):
+    """Print a list of dicts as a plain text table."""
+    widths = {
+        column: max(len(column), *(len(str(row.get(column, ""))) for row in rows))
+        for column in columns
+    }
+    print("  ".join(column.ljust(widths[column]) for column in columns))
+    print("  ".join("-" * widths[column] for column in columns))
+    for row in rows:
+        print("  ".join(str(row.get(column, "")).ljust(widths[column]) for column in columns))
@@ -0,0 +1,259 @@
+"""
+Reload test: set up a config entry on a Home Assistant core, unload and set
+it up again many times and fail when anything is left after an unload, or
+when objects or memory keep growing.
+
+    python benchmarks/reload.py --cycles 1000 --max-slope rss_mb=4
+
+The entry fetches from the fake api of soak.py and keeps the default
+entities, so every cycle refreshes, renders and sets up all platforms. Needs
+Home Assistant 2024.3 or later installed. After every unload the listeners,
+jobs and references of the entry lifecycle must be zero, and the event
+listeners, timers, tasks and entries of the core back at their count before
+the first setup. Slopes are per 1000 reloads, fitted after the warmup part of
+the run. Exits with status 1 on the first unload that leaves something behind
+or when a slope is above its limit.
+
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+
+from aiohttp import web
+
+from common import DIR_BENCHMARKS, DIR_FIXTURES, print_table
+from soak import SOAK_MAX_SLOPE, FakeApi, get_slope, sample
+
+# The integration is imported as custom_components.norwegianweather, like the
+# loader of Home Assistant does
+sys.path.insert(0, os.path.join(DIR_BENCHMARKS, ".."))
+from homeassistant import auth, bootstrap, loader  # noqa: E402
+from homeassistant.config_entries import ConfigEntries, ConfigEntry  # noqa: E402
+from homeassistant.core import HomeAssistant  # noqa: E402
+from homeassistant.helpers.entity_component import DATA_INSTANCES  # noqa: E402
+from homeassistant.helpers.entity_platform import DATA_ENTITY_PLATFORM  # noqa: E402
+from homeassistant.setup import async_setup_component  # noqa: E402
+
+from custom_components.norwegianweather.const import (  # noqa: E402
+    CONF_BASE_URL,
+    CONF_LAT,
+    CONF_LONG,
+    CONF_PLACE,
+    DOMAIN,
+)
+
+RELOAD_API_PORT = 8988
+RELOAD_HTTP_PORT = 8989
+
+# Allowed growth per 1000 reloads. Anything kept per reload shows up as about
+# 1000 listeners or timers, memory as several MB.
+RELOAD_MAX_SLOPE = {
+    **SOAK_MAX_SLOPE,
+    "listeners": 0.5,
+    "timers": 0.5,
+    "tasks": 0.5,
+    "entries": 0.5,
+}
+
+# Counts of the core that must be back where they were before the entry was
+# set up, after every unload
+RELOAD_RELEASED = ["listeners", "timers", "tasks", "entries"]
+
+# Resources of the entry lifecycle, all released on unload
+RELOAD_LIFECYCLE = ["listeners", "jobs", "refs", "shutdown"]
+
+
+def drop_unloaded_platforms(hass) -> int:
+    """Drop entity platforms of unloaded entries that the core keeps, return how many.
+
+    Some Home Assistant versions reset the platforms of an unloaded entry but
+    keep them in DATA_ENTITY_PLATFORM, four per reload here. They are not
+    owned by the integration and would hide its own leaks in the object count.
+    """
+    platforms = hass.data.get(DATA_ENTITY_PLATFORM, {}).get(DOMAIN, [])
+    current = {
+        id(platform)
+        for component in hass.data.get(DATA_INSTANCES, {}).values()
+        for platform in component._platforms.values()
+    }
+    kept = [platform for platform in platforms if id(platform) in current]
+    dropped = len(platforms) - len(kept)
+    platforms[:] = kept
+    return dropped
+
+
+def get_core_counts(hass) -> dict:
+    """Event listeners, timers, tasks and entries of the Home Assistant core."""
+    return {
+        "listeners": sum(hass.bus.async_listeners().values()),
+        # Cancelled timers stay in the heap until the loop drops them
+        "timers": sum(1 for handle in hass.loop._scheduled if not handle.cancelled()),
+        "tasks": len(asyncio.all_tasks(hass.loop)),
+        "entries": len(hass.data.get(DOMAIN, {})),
+    }
+
+
+def sample_hass(hass, cycle) -> dict:
+    """Resource counts of the process and of the Home Assistant core."""
+    core_platforms = drop_unloaded_platforms(hass)
+    result = sample(cycle)
+    result["core_platforms"] = core_platforms
+    result.update(get_core_counts(hass))
+    return result
+
+
+def get_unload_failures(lifecycle, counts, before) -> list:
+    """What an unload left behind, compared with the counts before setup."""
+    failures = [
+        f"lifecycle {key} {value}"
+        for key, value in lifecycle.stats().items()
+        if key in RELOAD_LIFECYCLE and value != 0
+    ]
+    failures += [
+        f"{key} {counts[key]}, {before[key]} before setup"
+        for key in RELOAD_RELEASED
+        if counts[key] > before[key]
+    ]
+    return failures
+
+
+def create_entry(base_url) -> ConfigEntry:
+    """Config entry of a location served by the fake api."""
+    return ConfigEntry(
+        version=1,
+        minor_version=1,
+        domain=DOMAIN,
+        title="Reload",
+        data={CONF_PLACE: "Reload", CONF_LAT: 59.9133, CONF_LONG: 10.7389},
+        options={CONF_BASE_URL: base_url},
+        source="user",
+    )
+
+
+async def start_hass(config_dir) -> HomeAssistant:
+    """Home Assistant core with registries, config entries and http loaded."""
+    hass = HomeAssistant(config_dir)
+    loader.async_setup(hass)
+    hass.config_entries = ConfigEntries(hass, {})
+    # Loads the registries and the empty config entries
+    await bootstrap.async_load_base_functionality(hass)
+    # http creates a system user on setup
+    hass.auth = await auth.auth_manager_from_config(hass, [{"type": "homeassistant"}], [])
+    http = {"server_host": ["127.0.0.1"], "server_port": RELOAD_HTTP_PORT}
+    if not await async_setup_component(hass, "http", {"http": http}):
+        raise SystemExit("Could not set up http")
+    await hass.async_start()
+    return hass
+
+
+async def unload(hass, entry, before, cycle):
+    """Unload the entry and stop the test if it left anything behind."""
+    lifecycle = hass.data[DOMAIN][entry.entry_id].lifecycle
+    if not await hass.config_entries.async_unload(entry.entry_id):
+        raise SystemExit(f"Unload {cycle} failed: {entry.state}")
+    await settle(hass)
+    failures = get_unload_failures(lifecycle, get_core_counts(hass), before)
+    if failures:
+        raise SystemExit(f"Unload {cycle} left {', '.join(failures)}")
+
+
+async def settle(hass):
+    """Wait for work started by a reload, such as rendering the image."""
+    await hass.async_block_till_done()
+    await asyncio.sleep(0)
+
+
+async def reload(cycles, sample_every):
+    with open(os.path.join(DIR_FIXTURES, "oslo.json"), "rb") as file:
+        fake = FakeApi(file.read())
+    app = web.Application()
+    app.router.add_get("/weatherapi/locationforecast/2.0/{datatype}", fake.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", RELOAD_API_PORT).start()
+
+    samples = []
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await start_hass(config_dir)
+        try:
+            entry = create_entry(f"http://127.0.0.1:{RELOAD_API_PORT}/weatherapi")
+            await hass.config_entries.async_add(entry)
+            await settle(hass)
+            # The first setup also loads the platforms, which stay loaded
+            await hass.config_entries.async_unload(entry.entry_id)
+            await settle(hass)
+            before = sample_hass(hass, 0)
+            for cycle in range(1, cycles + 1):
+                # A reload is an unload and a setup, checked in between
+                if not await hass.config_entries.async_setup(entry.entry_id):
+                    raise SystemExit(f"Setup {cycle} failed: {entry.state}")
+                await settle(hass)
+                await unload(hass, entry, before, cycle)
+                if cycle % sample_every == 0:
+                    samples.append(sample_hass(hass, cycle))
+                    print(json.dumps(samples[-1]), file=sys.stderr)
+            after = sample_hass(hass, cycles)
+        finally:
+            await hass.async_stop(force=True)
+            await runner.cleanup()
+    return samples, before, after, fake.requests
+
+
+def parse_slopes(values):
+    slopes = dict(RELOAD_MAX_SLOPE)
+    for value in values or []:
+        key, _, limit = value.partition("=")
+        if key not in slopes:
+            raise SystemExit(f"Unknown metric {key}, use one of {', '.join(slopes)}")
+        slopes[key] = float(limit)
+    return slopes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reload test for leaked listeners and memory")
+    parser.add_argument("-n", "--cycles", help="Reloads", default=1000, type=int)
+    parser.add_argument("--sample-every", help="Reloads between samples", default=25, type=int)
+    parser.add_argument("--warmup", help="Part of the samples to skip", default=0.2, type=float)
+    parser.add_argument(
+        "--max-slope", help="Limits as metric=growth per 1000 reloads", nargs="*"
+    )
+    args = parser.parse_args()
+    limits = parse_slopes(args.max_slope)
+    # The fixture is old, entities warn about missing current values
+    logging.basicConfig(level=logging.ERROR)
+
+    samples, before, after, requests = asyncio.run(reload(args.cycles, args.sample_every))
+    fitted = samples[int(len(samples) * args.warmup):]
+    if len(fitted) < 3:
+        raise SystemExit("Too few samples, run more reloads or sample more often")
+
+    rows = []
+    for key, limit in limits.items():
+        slope = get_slope(fitted, key)
+        released = key not in RELOAD_RELEASED or after[key] <= before[key]
+        rows.append(
+            {
+                "metric": key,
+                "before": before[key],
+                "first": fitted[0][key],
+                "last": fitted[-1][key],
+                "unloaded": after[key],
+                "slope/1000": round(slope, 3),
+                "limit": limit,
+                "result": "ok" if slope <= limit and released else "FAIL",
+            }
+        )
+    print(f"{args.cycles} reloads, {requests} requests")
+    print_table(
+        rows, ["metric", "before", "first", "last", "unloaded", "slope/1000", "limit", "result"]
+    )
+    if any(row["result"] != "ok" for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
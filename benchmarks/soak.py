@@ -0,0 +1,192 @@
+"""
+Soak test: run many refresh and render cycles against a local fake api and
+fail when memory, objects, file descriptors, threads, Pillow images or
+matplotlib figures keep growing.
+
+    python benchmarks/soak.py --cycles 2000 --max-slope rss_mb=2 objects=500
+
+Slopes are per 1000 cycles, fitted after the warmup part of the run. Exits
+with status 1 if any slope is above its limit.
+
+"""
+import argparse
+import asyncio
+import email.utils as eut
+import gc
+import json
+import os
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+
+import aiohttp
+from aiohttp import web
+from matplotlib.figure import Figure
+from PIL import Image
+
+from common import DIR_FIXTURES, api, print_table
+
+SOAK_PORT = 8987
+
+# Allowed growth per 1000 cycles, a leak per cycle shows up as hundreds. The
+# margins allow for one-off steps such as a second pooled connection.
+SOAK_MAX_SLOPE = {
+    "rss_mb": 4.0,
+    "objects": 500,
+    "fds": 2,
+    "threads": 1,
+    "pil_images": 1,
+    "figures": 0.5,
+}
+
+
+class FakeApi:
+    """Locationforecast endpoint serving the fixture, a new forecast every few requests."""
+
+    def __init__(self, payload: bytes, new_every=5):
+        self.payload = payload
+        self.new_every = max(1, new_every)
+        self.requests = 0
+        self.last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+
+    async def handle(self, request):
+        self.requests += 1
+        if self.requests % self.new_every == 0:
+            self.last_modified += timedelta(seconds=1)
+        headers = {
+            # Already expired, the client fetches on every cycle
+            "Expires": eut.format_datetime(datetime.now(timezone.utc), usegmt=True),
+            "Last-Modified": eut.format_datetime(self.last_modified, usegmt=True),
+        }
+        since = request.headers.get("If-Modified-Since", None)
+        if since is not None and eut.parsedate_to_datetime(since) >= self.last_modified:
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=self.payload, content_type="application/json", headers=headers)
+
+
+def count_instances(objects, cls):
+    return sum(1 for obj in objects if isinstance(obj, cls))
+
+
+def get_rss_mb():
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss / 2 ** 20
+    except ImportError:
+        with open("/proc/self/statm", "r") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+def sample(cycle) -> dict:
+    """Resource counts of the process after a full collection."""
+    gc.collect()
+    objects = gc.get_objects()
+    result = {
+        "cycle": cycle,
+        "rss_mb": round(get_rss_mb(), 2),
+        "objects": len(objects),
+        "fds": len(os.listdir("/proc/self/fd")) if os.path.isdir("/proc/self/fd") else 0,
+        "threads": threading.active_count(),
+        "pil_images": count_instances(objects, Image.Image),
+        "figures": count_instances(objects, Figure),
+    }
+    del objects
+    return result
+
+
+def get_slope(samples, key):
+    """Least squares slope of key per 1000 cycles."""
+    xs = [s["cycle"] for s in samples]
+    ys = [s[key] for s in samples]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    if not variance:
+        return 0.0
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    return covariance / variance * 1000
+
+
+async def soak(cycles, sample_every, new_every, plot):
+    with open(os.path.join(DIR_FIXTURES, "oslo.json"), "rb") as file:
+        fake = FakeApi(file.read(), new_every)
+    app = web.Application()
+    app.router.add_get("/weatherapi/locationforecast/2.0/{datatype}", fake.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", SOAK_PORT).start()
+
+    samples = []
+    try:
+        async with aiohttp.ClientSession() as session:
+            client = api.NorwegianWeatherApiClient(
+                "Soak",
+                59.9133,
+                10.7389,
+                session,
+                save_image=False,
+                base_url=f"http://127.0.0.1:{SOAK_PORT}/weatherapi",
+            )
+            client.demand_plot = plot
+            for cycle in range(1, cycles + 1):
+                await client.async_get_data()
+                if cycle % sample_every == 0:
+                    samples.append(sample(cycle))
+                    print(json.dumps(samples[-1]), file=sys.stderr)
+    finally:
+        await runner.cleanup()
+    return samples, fake.requests, client.generation
+
+
+def parse_slopes(values):
+    slopes = dict(SOAK_MAX_SLOPE)
+    for value in values or []:
+        key, _, limit = value.partition("=")
+        if key not in slopes:
+            raise SystemExit(f"Unknown metric {key}, use one of {', '.join(slopes)}")
+        slopes[key] = float(limit)
+    return slopes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak test for resource leaks")
+    parser.add_argument("-n", "--cycles", help="Refresh cycles", default=2000, type=int)
+    parser.add_argument("--sample-every", help="Cycles between samples", default=50, type=int)
+    parser.add_argument("--new-every", help="Requests per new forecast", default=5, type=int)
+    parser.add_argument("--warmup", help="Part of the samples to skip", default=0.2, type=float)
+    parser.add_argument("--no-plot", help="Do not render the plot", action="store_true")
+    parser.add_argument(
+        "--max-slope", help="Limits as metric=growth per 1000 cycles", nargs="*"
+    )
+    args = parser.parse_args()
+    limits = parse_slopes(args.max_slope)
+
+    samples, requests, generations = asyncio.run(
+        soak(args.cycles, args.sample_every, args.new_every, not args.no_plot)
+    )
+    fitted = samples[int(len(samples) * args.warmup):]
+    if len(fitted) < 3:
+        raise SystemExit("Too few samples, run more cycles or sample more often")
+
+    rows = []
+    for key, limit in limits.items():
+        slope = get_slope(fitted, key)
+        rows.append(
+            {
+                "metric": key,
+                "first": fitted[0][key],
+                "last": fitted[-1][key],
+                "slope/1000": round(slope, 3),
+                "limit": limit,
+                "result": "ok" if slope <= limit else "FAIL",
+            }
+        )
+    print(f"{args.cycles} cycles, {requests} requests, {generations} forecasts")
+    print_table(rows, ["metric", "first", "last", "slope/1000", "limit", "result"])
+    if any(row["result"] != "ok" for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
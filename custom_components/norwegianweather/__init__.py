@@ -2,7 +2,6 @@
 Custom integration to integrate NorwegianWeather with Home Assistant.
 
 """
-import asyncio
 import os
 # from homeassistant.const import CONF_MONITORED_CONDITIONS
 # from datetime import timedelta
@@ -10,7 +9,8 @@ import logging
 
 from homeassistant.config_entries import ConfigEntry
 # from homeassistant.core import Config, HomeAssistant
-from homeassistant.core import HomeAssistant
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.typing import ConfigType
 from homeassistant.exceptions import ConfigEntryNotReady
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
@@ -18,8 +18,13 @@ from homeassistant.helpers.aiohttp_client import async_get_clientsession
 # from homeassistant.helpers.event import async_track_time_interval
 
 # from .entity import convert_units_funcs
-from .api import NorwegianWeatherApiClient
+from .api import (
+    WEATHER_ICONS,
+    NorwegianWeatherApiClient,
+    RenderQueue,
+)
 from .coordinator import NorwegianWeatherDataUpdateCoordinator
+from .view import NorwegianWeatherImageView
 # from .binary_sensor import NorwegianWeatherBinarySensor
 # from .switch import NorwegianWeatherSwitch
 # from .sensor import NorwegianWeatherSensor
@@ -29,8 +34,12 @@ from .const import (
     CONF_LONG,
     CONF_PLACE,
     DOMAIN,
+    DOMAIN_PROBES,
+    DOMAIN_RENDER,
     ENTITIES,
     PLATFORMS,
+    RENDER_QUEUE_SIZE,
+    RENDER_WORKERS,
     STARTUP_MESSAGE,
 )
 
@@ -43,6 +52,18 @@ _LOGGER: logging.Logger = logging.getLogger(__package__)
 # async def async_setup(hass: HomeAssistant, config: Config):
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     """Set up this integration using YAML is not supported."""
+    if hass.http is not None:
+        hass.http.register_view(NorwegianWeatherImageView(hass))
+
+    # One bounded render queue for all locations instead of the shared executor
+    render_queue = RenderQueue(workers=RENDER_WORKERS, maxsize=RENDER_QUEUE_SIZE)
+    hass.data[DOMAIN_RENDER] = render_queue
+
+    @callback
+    def async_close_render_queue(event):
+        render_queue.close()
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, async_close_render_queue)
     return True
 
 
@@ -58,23 +79,32 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
 
     session = async_get_clientsession(hass)
     client = NorwegianWeatherApiClient(place, latitude, longitude, session)
+    client.render_queue = hass.data.get(DOMAIN_RENDER, None)
+
+    # Reuse payload fetched while validating the location in config flow
+    probe = hass.data.get(DOMAIN_PROBES, {}).pop(client.location.key(), None)
+    if probe is not None:
+        _LOGGER.debug(f"Reusing payload from config flow for {place}.")
+        client.set_cache(probe)
 
     coordinator = NorwegianWeatherDataUpdateCoordinator(
         hass, entry=entry, client=client
     )
+    # Entities decide which data the first refresh has to process
+    coordinator._create_entitites()
+    if client.demand_image:
+        coordinator.lifecycle.add_job(WEATHER_ICONS.prewarm)
+
     # await coordinator.async_refresh()
     # https://developers.home-assistant.io/docs/integration_fetching_data#coordinated-single-api-poll-for-data-for-all-entities
     await coordinator.async_config_entry_first_refresh()
 
-
-    coordinator._create_entitites()
-
     if not coordinator.last_update_success:
         raise ConfigEntryNotReady
 
     # hass.data[DOMAIN]["coordinator"] = coordinator
     hass.data[DOMAIN][entry.entry_id] = coordinator
-    hass.data[DOMAIN]["entities"] = []
+    coordinator.lifecycle.add_ref(hass.data[DOMAIN], entry.entry_id)
 
     # for platform in PLATFORMS:
     #     if entry.options.get(platform, True):
@@ -84,8 +114,7 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     #         )
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
-    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
-    # entry.add_update_listener(async_reload_entry)
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
 
     await coordinator.add_schedulers()
     return True
@@ -95,23 +124,17 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Handle removal of an entry."""
     coordinator = hass.data[DOMAIN][entry.entry_id]
     _LOGGER.debug(f"Unloading {DOMAIN}: {coordinator.place}")
-    unloaded = all(
-        await asyncio.gather(
-            *[
-                hass.config_entries.async_forward_entry_unload(entry, platform)
-                for platform in PLATFORMS
-                if platform in coordinator.platforms
-            ]
-        )
+    unloaded = await hass.config_entries.async_unload_platforms(
+        entry, coordinator.platforms
     )
     if unloaded:
-        hass.data[DOMAIN].pop(entry.entry_id)
+        await coordinator.lifecycle.async_teardown()
     return unloaded
 
 
-async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
-    """Reload config entry."""
+async def async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply changed options without reloading, reusing data and image."""
     coordinator = hass.data[DOMAIN][entry.entry_id]
-    _LOGGER.debug(f"Reloading {DOMAIN}: {coordinator.place}")
-    await async_unload_entry(hass, entry)
-    await async_setup_entry(hass, entry)
+    _LOGGER.debug(f"Updating options {DOMAIN}: {coordinator.place}")
+    await coordinator.async_update_options()
+
@@ -3,31 +3,49 @@ import pytz
 import datetime as dt
 import logging
 import asyncio
+import concurrent.futures
+import csv
+import functools
+import gzip
+import multiprocessing
 import socket
 from typing import List, Optional, Union
 import aiohttp
+from aiohttp import web
 import xml.etree.ElementTree as ET
 import re
 import argparse
 import json
 import io
+import math
+import hashlib
+import tarfile
+import tempfile
+import threading
+import time as timer
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from xml.sax.saxutils import escape as xml_escape
 
 from decimal import Decimal
 import email.utils as eut
 
 # image stuff
 import os, sys
-from PIL import Image, TarIO, ImageDraw, ImageFont
+from PIL import Image, ImageDraw, ImageFont, features
 
 # matplotstuff
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 import numpy as np
 
 API_NAME = "norwegianweather"
 API_ATTRIBUTION = "Data from MET Norway (www.met.no)"
 VERSION = "0.2.2"
 API_USER_AGENT = f"{API_NAME}/{VERSION} github.com/tmjo/ha-norwegianweather"
+API_BASE_URL = "https://api.met.no/weatherapi"
 API_STRINGTIME = "%Y-%m-%dT%H:%M:%S%z"
 API_LANG = "nb"
 TIMEOUT = 20
@@ -87,6 +105,17 @@ CONST_WEATHERDATA = {
     "wind_from_direction_cardinal": "Wind direction",
 }
 
+# Columns per image page, the first page is rendered on every new forecast
+CONST_IMAGE_PAGE_SIZE = 6
+CONST_IMAGE_HORIZON_MAX = 90
+
+CONST_PLOTVALUES = [
+    "air_temperature",
+    "precipitation_amount",
+    "wind_speed",
+    "wind_speed_of_gust",
+]
+
 CONST_IMAGEVALUES = [
     "air_temperature",
     "precipitation_amount",
@@ -102,6 +131,26 @@ CONST_IMAGEVALUES = [
     "relative_humidity",
 ]
 
+# Most common symbol codes, decoded up front when pre-warming the icon cache
+CONST_WEATHERICONS_PREWARM = [
+    "clearsky_day",
+    "clearsky_night",
+    "fair_day",
+    "fair_night",
+    "partlycloudy_day",
+    "partlycloudy_night",
+    "cloudy",
+    "fog",
+    "lightrain",
+    "rain",
+    "heavyrain",
+    "lightrainshowers_day",
+    "rainshowers_day",
+    "lightsnow",
+    "snow",
+    "sleet",
+]
+
 CONST_INTERVAL_INST = "instant"
 CONST_INTERVAL_1H = "next_1_hours"
 CONST_INTERVAL_6H = "next_6_hours"
@@ -124,10 +173,13 @@ class NorwegianWeatherApiClient:
         session: aiohttp.ClientSession,
         altitude=0,
         output_dir=CONST_DIR_DEFAULT,
+        save_image=True,
+        base_url=API_BASE_URL,
     ) -> None:
 
         """Sample API Client."""
         self._session = session
+        self.base_url = base_url
         self.location = Location(place, latitude, longitude, altitude)
         self.yrdata = None
         self.data = {}
@@ -137,6 +189,38 @@ class NorwegianWeatherApiClient:
         self.output_dir = output_dir
         self.file_image = API_NAME + "_" + self.location.name + "_img.png"
         self.file_plot = API_NAME + "_" + self.location.name + "_plot.png"
+        self.save_image = save_image
+        self.image = None
+        self.image_hash = None
+        self.image_format = "png"
+        self.image_profile = "default"
+        self.image_backend = "png"
+        self.image_horizon = CONST_IMAGE_PAGE_SIZE
+        self.image_pages = {}
+        self._pages_generation = None
+        self._pages_lock = threading.Lock()
+        self._series_lock = threading.Lock()
+        self.image_variants = ImageVariantCache()
+        self.executor_job = None
+        self.timings = StageTimings()
+        self.generation = 0
+        self.demand_keys = None
+        self.demand_image = True
+        self.demand_timeseries = True
+        self.stage_counters = {}
+        self._raw_timeseries = []
+        self._parsed_generation = None
+        self._rendered_generation = None
+        self._queued_generation = None
+        self.render_queue = None
+        self.render_pool = None
+        self.image_callback = None
+        self.demand_plot = False
+        self.plot = None
+        self.plot_hash = None
+        self.weather_plot = None
+        self._plotted_generation = None
+        self._queued_plot_generation = None
 
     def get_url(
         self,
@@ -152,29 +236,72 @@ class NorwegianWeatherApiClient:
         if altitude is None:
             altitude = self.location.altitude
 
-        url = f"https://api.met.no/weatherapi/locationforecast/2.0/{datatype}?lat={latitude}&lon={longitude}&altitude={altitude}"
+        base_url = (self.base_url or API_BASE_URL).rstrip("/")
+        url = f"{base_url}/locationforecast/2.0/{datatype}?lat={latitude}&lon={longitude}&altitude={altitude}"
         return url
 
+    async def async_probe(self) -> bool:
+        """Fetch data and check its shape without processing or rendering."""
+        _LOGGER.debug(f"Probing API for {self.location.name}.")
+        headers = {"User-Agent": API_USER_AGENT}
+        payload = await self.api_wrapper(
+            method="get", url=self.get_url(), data={}, headers=headers
+        )
+        if not validate_payload(payload):
+            _LOGGER.debug(f"Probe for {self.location.name} returned unusable data.")
+            return False
+        self.yrdata = payload
+        return True
+
+    def get_cache(self) -> dict:
+        """Return fetched payload and its http cache dates for reuse."""
+        return {
+            "yrdata": self.yrdata,
+            "expires": self.expires,
+            "last_modified": self.last_modified,
+        }
+
+    def set_cache(self, cache: dict):
+        """Reuse a payload fetched elsewhere, e.g. by the config flow probe."""
+        self.yrdata = cache.get("yrdata")
+        self.generation += 1
+        self.expires = cache.get("expires")
+        self.last_modified = cache.get("last_modified")
+
     async def async_get_data(self) -> dict:
         """Get data from the API."""
+        with self.timings.span("refresh"):
+            data = await self._async_get_data()
+        if data:
+            data["refresh_time"] = self.timings.last.get("refresh")
+            if self.demand_keys is None or "timings" in self.demand_keys:
+                data["timings"] = self.timings.summary()
+        return data
+
+    async def _async_get_data(self) -> dict:
+        await self.async_fetch()
+        if self.yrdata is not None:
+            # self.process_data()
+            await self.process_data()
+            return self.data
+        return {}
 
+    async def async_fetch(self):
+        """Fetch new data from the API if the cached data has expired."""
         if self.expires is None or datetime.now(timezone.utc) > self.expires:
             _LOGGER.debug(
                 f"Calling API to fetch new data (expired: {self.expires} now: {datetime.now(timezone.utc)})"
             )
             headers = {"User-Agent": API_USER_AGENT}
-            self.yrdata = await self.api_wrapper(method="get", url=self.get_url(),data={},headers=headers)
+            yrdata = await self.api_wrapper(method="get", url=self.get_url(),data={},headers=headers)
+            if yrdata is not self.yrdata:
+                self.generation += 1
+            self.yrdata = yrdata
         else:
             _LOGGER.debug(
                 f"Data still valid, skipping call to API (expires: {self.expires} now: {datetime.now(timezone.utc)})."
             )
 
-        if self.yrdata is not None:
-            # self.process_data()
-            await self.process_data()
-            return self.data
-        return {}
-
     async def api_wrapper(
         self, method: str, url: str, data: dict = {}, headers: dict = {}
     ) -> dict:
@@ -186,12 +313,25 @@ class NorwegianWeatherApiClient:
                         self.last_modified, usegmt=True
                     )
                 }
-                response = await self._session.get(
-                    url,
-                    headers={**headers, **ims_headers},
-                    timeout=aiohttp.ClientTimeout(total=TIMEOUT),
-                )
+                with self.timings.span("fetch"):
+                    response = await self._session.get(
+                        url,
+                        headers={**headers, **ims_headers},
+                        timeout=aiohttp.ClientTimeout(total=TIMEOUT),
+                        trace_request_ctx={"timings": self.timings},
+                    )
                 if response.status == 304:  # 304 - not modified
+                    # The data is unchanged but valid for longer, refresh on
+                    # the new Expires instead of the passed one
+                    if "expires" in response.headers:
+                        self.expires = (
+                            parse_http_date(response.headers["expires"]) or self.expires
+                        )
+                    if "last-modified" in response.headers:
+                        self.last_modified = (
+                            parse_http_date(response.headers["last-modified"])
+                            or self.last_modified
+                        )
                     _LOGGER.debug(
                         f"API response: {response.status} Expires: {self.expires} Last modified: {self.last_modified} Returning existing data."
                     )
@@ -200,15 +340,20 @@ class NorwegianWeatherApiClient:
                     _LOGGER.error("API returned code 403 forbidden.")
                     return {}
                
-            response = await self._session.get(
-                url, headers=headers, timeout=aiohttp.ClientTimeout(total=TIMEOUT)
-            )
+            with self.timings.span("fetch"):
+                response = await self._session.get(
+                    url,
+                    headers=headers,
+                    timeout=aiohttp.ClientTimeout(total=TIMEOUT),
+                    trace_request_ctx={"timings": self.timings},
+                )
             self.expires = parse_http_date(response.headers["expires"])
             self.last_modified = parse_http_date(response.headers["last-modified"])
             _LOGGER.debug(
                 f"API response: {response.status} Expires: {self.expires} Last modified: {self.last_modified}"
             )
-            return await response.json()
+            with self.timings.span("decode"):
+                return await response.json()
 
         except asyncio.TimeoutError as e:
             _LOGGER.error(f"Timeout error fetching information from API")
@@ -223,44 +368,82 @@ class NorwegianWeatherApiClient:
             _LOGGER.error(f"Something really wrong happend!")
             _LOGGER.debug(f"Timeout {url} - {e}")
 
-    async def process_data(self, maxserie=10):
+    async def async_run_job(self, target, *args):
+        """Run blocking work through the executor_job hook if one is set."""
+        if self.executor_job is not None:
+            return await self.executor_job(target, *args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, target, *args)
+
+    async def process_data(self, maxserie=10, qty=6):
         _LOGGER.debug("Processing data.")
         if self.yrdata is not None:
-            # Add yrdata
-            props = self.yrdata.get("properties", None)
-            if props is not None:
-                self.location.met_units = props.get("meta").get("units")
-                for key, unit in self.location.met_units.items():
-                    self.location.units[key] = CONST_DISPLAY_UNITS.get(unit, unit)
-                _LOGGER.debug(f"Processing data - {len(self.location.units)} units.")
-                timeseries = props.get("timeseries", None)
-                if timeseries is not None:
-                    _LOGGER.debug(f"Processing data - {len(timeseries)} timeseries.")
-                    self.location.time_series = []
-                    for serie in timeseries:
-                        self.location.time_series.append(
-                            Timeserie(
-                                self.location, serie.get("time"), serie.get("data")
-                            )
-                        )
+            # Parse payload once per generation, timeseries are built on demand
+            if self._parsed_generation != self.generation:
+                with self.timings.span("parse"):
+                    self.parse_data()
+                self._parsed_generation = self.generation
+                self.count_stage("parse")
+            else:
+                self.count_stage("parse", run=0, cached=1)
+
             # Internal tweaks
             self.data = {}
             intervals = []
-            i = 0
-            for serie in self.location.time_series:
-                if i >= maxserie:
-                    break
-                i += 1
-                intervals.append(serie.get_intervals_hourly_data())
-            
-            loop = asyncio.get_running_loop()
-            try:
-                # self.process_weather_image(intervals)  
-                # When calling a blocking function in your library code (https://developers.home-assistant.io/docs/asyncio_blocking_operations/)
-                
-                await loop.run_in_executor(None, self.process_weather_image, intervals)
-            except Exception as e:  # pylint: disable=broad-except
-                _LOGGER.warning(f"Error processing weather image: {e}")
+            if self.demand_timeseries or self.demand_image or self.demand_plot:
+                self.ensure_time_series(maxserie)
+                with self.timings.span("derive"):
+                    for serie in self.location.time_series[:maxserie]:
+                        intervals.append(serie.get_intervals_hourly_data())
+                self.count_stage("intervals")
+            else:
+                self.count_stage("intervals", run=0, skipped=1)
+
+            if not self.demand_image:
+                self.count_stage("image", run=0, skipped=1)
+            elif self.generation in (self._rendered_generation, self._queued_generation):
+                self.count_stage("image", run=0, cached=1)
+            elif self.render_queue is not None:
+                # Rendering runs on the shared workers, the refresh does not wait
+                self._queued_generation = self.generation
+                future = self.render_queue.submit(
+                    self.location.key(), self.render_image, intervals, qty, self.generation
+                )
+                future.add_done_callback(
+                    functools.partial(self._render_done, self.generation)
+                )
+                self.count_stage("image")
+            else:
+                try:
+                    # self.process_weather_image(intervals)  
+                    # When calling a blocking function in your library code (https://developers.home-assistant.io/docs/asyncio_blocking_operations/)
+                    
+                    await self.async_run_job(self.process_weather_image, intervals, None, qty)
+                    self._rendered_generation = self.generation
+                    self.count_stage("image")
+                except Exception as e:  # pylint: disable=broad-except
+                    _LOGGER.warning(f"Error processing weather image: {e}")
+
+            if not self.demand_plot:
+                self.count_stage("plot", run=0, skipped=1)
+            elif self.generation in (self._plotted_generation, self._queued_plot_generation):
+                self.count_stage("plot", run=0, cached=1)
+            elif self.render_queue is not None:
+                self._queued_plot_generation = self.generation
+                future = self.render_queue.submit(
+                    self.location.key() + "/plot", self.render_plot, intervals, self.generation
+                )
+                future.add_done_callback(
+                    functools.partial(self._plot_done, self.generation)
+                )
+                self.count_stage("plot")
+            else:
+                try:
+                    await self.async_run_job(self.process_weather_plot, intervals)
+                    self._plotted_generation = self.generation
+                    self.count_stage("plot")
+                except Exception as e:  # pylint: disable=broad-except
+                    _LOGGER.warning(f"Error processing weather plot: {e}")
 
             # try:
             #     # self.process_weather_plot(intervals)
@@ -269,70 +452,602 @@ class NorwegianWeatherApiClient:
             # except Exception as e:  # pylint: disable=broad-except
             #     _LOGGER.warning(f"Error processing weather plot: {e}")
 
-            self.current = self.location.get_timeserie_time_hourlydata(dt_now())
+            now = dt_now()
+            self.ensure_time_series(self.get_time_series_count(now))
+            with self.timings.span("derive"):
+                self.current = self.location.get_timeserie_time_hourlydata(now) or {}
 
-            self.data["timeseries"] = intervals
+            if self.demand_timeseries:
+                self.data["timeseries"] = intervals
+                self.count_stage("timeseries")
+            else:
+                self.count_stage("timeseries", run=0, skipped=1)
             self.data["latitude"] = self.location.latitude
             self.data["longitude"] = self.location.longitude
             self.data["place"] = self.location.name
+            computed = 0
             for data in CONST_WEATHERDATA:
-                self.data[data] = self.current.get(data, None)
+                if self.demand_keys is None or data in self.demand_keys:
+                    self.data[data] = self.current.get(data, None)
+                    computed += 1
+            self.count_stage(
+                "variables", computed, len(CONST_WEATHERDATA) - computed
+            )
+
+    def parse_data(self):
+        """Read units and raw timeseries, dropping previously built objects."""
+        props = self.yrdata.get("properties", None)
+        self.location.time_series = []
+        self._raw_timeseries = []
+        if props is not None:
+            self.location.met_units = props.get("meta").get("units")
+            for key, unit in self.location.met_units.items():
+                self.location.units[key] = CONST_DISPLAY_UNITS.get(unit, unit)
+            _LOGGER.debug(f"Processing data - {len(self.location.units)} units.")
+            timeseries = props.get("timeseries", None)
+            if timeseries is not None:
+                _LOGGER.debug(f"Processing data - {len(timeseries)} timeseries.")
+                self._raw_timeseries = timeseries
+
+    def ensure_time_series(self, count):
+        """Build Timeserie objects for the first count entries of the payload."""
+        time_series = self.location.time_series
+        count = min(count, len(self._raw_timeseries))
+        if len(time_series) >= count:
+            return
+        # Image pages are built from executor threads as well
+        with self._series_lock, self.timings.span("timeserie"):
+            while len(time_series) < count:
+                serie = self._raw_timeseries[len(time_series)]
+                time_series.append(
+                    Timeserie(self.location, serie.get("time"), serie.get("data"))
+                )
 
-    def process_weather_image(self, weatherdata, filename=None, qty=6):
-        images = []
+    def get_time_series_count(self, time: dt.datetime):
+        """Return number of entries needed to find the interval at time."""
+        for i, serie in enumerate(self._raw_timeseries):
+            if i < len(self.location.time_series):
+                serie_time = self.location.time_series[i].time
+            else:
+                serie_time = dt_parse_datetime(serie.get("time"))
+            if serie_time is not None and serie_time > time:
+                return i + 1
+        return len(self._raw_timeseries)
+
+    def set_demand(self, keys=None, image=True, timeseries=True, plot=False) -> bool:
+        """Limit processing to what is consumed, return True if demand grew."""
+        old_keys = self.demand_keys
+        grew = (
+            (image and not self.demand_image)
+            or (timeseries and not self.demand_timeseries)
+            or (plot and not self.demand_plot)
+        )
+        if keys is not None:
+            keys = set(keys)
+            if old_keys is not None and not keys <= old_keys:
+                grew = True
+        elif old_keys is not None:
+            grew = True
+        self.demand_keys = keys
+        self.demand_image = image
+        self.demand_timeseries = timeseries
+        self.demand_plot = plot
+
+        # Derived values are calculated while building intervals
+        if timeseries or keys is None:
+            derived = None
+        else:
+            derived = set(keys)
+            if image:
+                derived.update(CONST_IMAGEVALUES)
+            if plot:
+                derived.update(CONST_PLOTVALUES)
+        if derived != self.location.derived and not (
+            self.location.derived is None
+            or (derived is not None and derived <= self.location.derived)
+        ):
+            self._parsed_generation = None
+        self.location.derived = derived
+        return grew
+
+    def count_stage(self, stage, run=1, skipped=0, cached=0):
+        """Count runs, skips and cache hits of a processing stage."""
+        counter = self.stage_counters.setdefault(
+            stage, {"run": 0, "skipped": 0, "cached": 0}
+        )
+        counter["run"] += run
+        counter["skipped"] += skipped
+        counter["cached"] += cached
+
+    def render_image(self, weatherdata, qty, generation):
+        """Queued render job, skipped when a newer forecast arrived meanwhile."""
+        if generation != self.generation:
+            _LOGGER.debug(f"Skipping image of old forecast for {self.location.name}.")
+            return None
+        image = self.process_weather_image(weatherdata, None, qty)
+        self._rendered_generation = generation
+        return image
+
+    def _render_done(self, generation, future):
+        # Dropped or failed renders are queued again on the next refresh
+        if future.cancelled() or future.exception() is not None:
+            if self._queued_generation == generation:
+                self._queued_generation = None
+
+    def process_weather_image(self, weatherdata, filename=None, qty=6, profile=None):
+        columns = []
         if weatherdata is not None:
             _LOGGER.debug(
                 f"Processing weather image from {len(weatherdata)} time intervals - creating {qty} images."
             )
-            cnt = 0
-            _LOGGER.debug(f"PIL/image version: {Image.__version__}")
-            font = weatherimage_font()
-            for data in weatherdata:
-                time = data.get("time", None)
-                imagedata = image_create_process_data(time, data, self.location.units)
-
-                if cnt == 0:
-                    # Create image legend by tweaking content
-                    legenddata = {}
-                    for k in imagedata:
-                        legenddata[k] = CONST_WEATHERDATA.get(k, k)
-                    legenddata["time"] = imagedata["date"] + "\n" + self.location.name
-                    legenddata["symbol_code"] = None
-                    imagelegend = image_create(legenddata, font)
-                    images.append(imagelegend)
-                elif cnt >= qty:
-                    break
-                cnt += 1
-
-                image = image_create(imagedata, font)
-                images.append(image)
-                _LOGGER.debug(
-                    f"Processing image for interval {time} - size: {image.size}"
-                )
-            font = None
+            columns = self.get_image_columns(weatherdata, qty)
         else:
             _LOGGER.debug("Could not find any intervals for image processing.")
+        if not columns:
+            _LOGGER.debug("No columns to draw, skipping weather image.")
+            return
 
-        _LOGGER.debug(f"Processing image - combining {len(images)} images.")
-        newimage = image_list_combine(images)
+        image = self.render_columns(columns, profile)
+        self.publish_image(image)
 
-        if filename is None:
-            filename = os.path.join(self.output_dir, self.file_image)
+        if filename is not None or self.save_image:
+            try:
+                self.persist_image(filename)
+            except OSError as e:
+                # Readers get the published bytes, the file is only a copy
+                _LOGGER.warning(f"Could not save image for {self.location.name}: {e}")
+        return self.image
+
+    def invalidate_image(self):
+        """Render the image again on the next processing of the same data."""
+        self._rendered_generation = None
+        self._queued_generation = None
+
+    def publish_image(self, image: bytes):
+        """Make encoded image bytes and their content hash available to readers."""
+        image_hash = hashlib.sha1(image).hexdigest()
+        # Readers take both attributes without locking, replace them as one
+        self.image, self.image_hash = image, image_hash
+        _LOGGER.debug(f"Published image {image_hash[:8]}, {len(image)} bytes.")
+        if self.image_callback is not None:
+            self.image_callback()
+
+    def get_image_variant(self, width=None, height=None, source=None):
+        """Return the published image resized and encoded for a reader, cached.
+
+        Readers that already took image and hash pass them as source, so the
+        variant matches the hash they hold.
+        """
+        image, image_hash = source or (self.image, self.image_hash)
+        image_format = get_image_format(self.image_format)
+        if image is None:
+            return None
+        size = (width or None, height or None)
+        if (image_format == "png" and size == (None, None)) or is_svg(image):
+            return image
+        key = (image_hash, size, image_format)
+        variant = self.image_variants.get(key)
+        if variant is None:
+            with self.timings.span("variant"):
+                variant = image_create_variant(image, *size, image_format)
+            self.image_variants.put(key, variant)
+        return variant
+
+    def get_image_path(self):
+        if self.image_backend == "svg":
+            return os.path.join(
+                self.output_dir, os.path.splitext(self.file_image)[0] + ".svg"
+            )
+        return os.path.join(self.output_dir, self.file_image)
 
+    def persist_image(self, filename=None):
+        """Write the published image to file, replacing it atomically."""
+        if self.image is None:
+            return
+        if filename is None:
+            filename = self.get_image_path()
         _LOGGER.debug(f"Saving image {filename}.")
-        newimage.save(filename, "png")
+        with self.timings.span("persist"):
+            write_file_atomic(filename, self.image)
+
+    def render_columns(self, columns, profile=None) -> bytes:
+        """Render and encode image columns with the configured backend."""
+        profile = profile or self.image_profile
+        if self.image_backend == "svg":
+            # Vector output, scaled by the browser instead of rasterised here
+            with self.timings.span("render"):
+                return image_create_svg(columns).encode("utf-8")
+        if self.render_pool is not None:
+            with self.timings.span("render"):
+                return self.render_pool.render(columns, profile)
+
+        _LOGGER.debug(f"PIL/image version: {Image.__version__}")
+        with self.timings.span("render"):
+            newimage = image_create_strip(columns, get_text_atlas(), COLUMN_TILES)
+        with self.timings.span("encode"):
+            image = image_encode_png(newimage, profile)
         newimage.close()
-        images = None
+        return image
+
+    def get_image_page_count(self, qty=CONST_IMAGE_PAGE_SIZE):
+        """Number of image pages of qty columns within the configured horizon."""
+        horizon = min(self.image_horizon, len(self._raw_timeseries))
+        return max(1, math.ceil(horizon / qty))
+
+    def get_image_page(self, page, qty=CONST_IMAGE_PAGE_SIZE):
+        """Return bytes and hash of an image page, rendered on first request.
+
+        Page 0 is the image rendered on refresh, later pages are rendered
+        only when asked for and kept until the forecast changes.
+        """
+        if page == 0:
+            return self.image, self.image_hash
+        if self.yrdata is None or not 0 < page < self.get_image_page_count(qty):
+            return None, None
+
+        generation = self.generation
+        key = (page, qty, self.image_backend, self.image_profile)
+        with self._pages_lock:
+            if self._pages_generation != generation:
+                self.image_pages.clear()
+                self._pages_generation = generation
+            cached = self.image_pages.get(key, None)
+        if cached is not None:
+            self.count_stage("page", run=0, cached=1)
+            return cached
+
+        start = page * qty
+        end = min(start + qty, self.image_horizon)
+        self.ensure_time_series(end)
+        intervals = [
+            serie.get_intervals_image_data()
+            for serie in self.location.time_series[start:end]
+        ]
+        _LOGGER.debug(f"Rendering image page {page} for {self.location.name}.")
+        with self.timings.span("page"):
+            image = self.render_columns(self.get_image_columns(intervals, qty))
+        result = (image, hashlib.sha1(image).hexdigest())
+        self.count_stage("page")
+        with self._pages_lock:
+            # A page of an older forecast is returned but not kept
+            if self._pages_generation == generation == self.generation:
+                self.image_pages[key] = result
+        return result
+
+    def get_image_columns(self, weatherdata, qty=6):
+        """Return image data of the legend followed by qty forecast columns."""
+        columns = []
+        for data in weatherdata[:qty]:
+            time = data.get("time", None)
+            imagedata = image_create_process_data(time, data, self.location.units)
+
+            if not columns:
+                # Create image legend by tweaking content
+                legenddata = {}
+                for k in imagedata:
+                    legenddata[k] = CONST_WEATHERDATA.get(k, k)
+                legenddata["time"] = imagedata["date"] + "\n" + self.location.name
+                legenddata["symbol_code"] = None
+                columns.append(legenddata)
+            columns.append(imagedata)
+        return columns
+
+    def render_plot(self, weatherdata, generation):
+        """Queued plot job, skipped when a newer forecast arrived meanwhile."""
+        if generation != self.generation:
+            return None
+        plot = self.process_weather_plot(weatherdata)
+        self._plotted_generation = generation
+        return plot
 
+    def _plot_done(self, generation, future):
+        if future.cancelled() or future.exception() is not None:
+            if self._queued_plot_generation == generation:
+                self._queued_plot_generation = None
 
     # def process_weather_plot(self, weatherdata, filename=None):
     def process_weather_plot(self, weatherdata, filename=None):
-        if filename is None:
-            filename = os.path.join(self.output_dir, self.file_plot)
-        _LOGGER.debug(f"Saving plot {filename}.")
-        plot_weatherdata(
-            weatherdata, show=False, filename=filename, location_name=self.location.name
+        """Draw the forecast chart on the reused figure of this location."""
+        if self.weather_plot is None:
+            self.weather_plot = WeatherPlot()
+        with self.timings.span("plot"):
+            plot = self.weather_plot.render(
+                weatherdata, self.location.name, self.location.units
+            )
+        self.plot, self.plot_hash = plot, hashlib.sha1(plot).hexdigest()
+        if self.image_callback is not None:
+            self.image_callback()
+
+        if filename is not None or self.save_image:
+            if filename is None:
+                filename = os.path.join(self.output_dir, self.file_plot)
+            _LOGGER.debug(f"Saving plot {filename}.")
+            try:
+                write_file_atomic(filename, plot)
+            except OSError as e:
+                _LOGGER.warning(f"Could not save plot for {self.location.name}: {e}")
+        return plot
+
+
+class StageTimings:
+    """Rolling durations of pipeline stages, recorded from any thread."""
+
+    def __init__(self, maxlen=100):
+        self.maxlen = maxlen
+        self.samples = {}
+        self.last = {}
+        self.totals = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage):
+        start = timer.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, timer.perf_counter() - start)
+
+    def record(self, stage, seconds):
+        ms = round(seconds * 1000, 2)
+        with self._lock:
+            samples = self.samples.get(stage, None)
+            if samples is None:
+                samples = self.samples[stage] = deque(maxlen=self.maxlen)
+            samples.append(ms)
+            self.last[stage] = ms
+            count, total = self.totals.get(stage, (0, 0.0))
+            self.totals[stage] = (count + 1, total + ms)
+
+    def summary(self) -> dict:
+        """Return count, last and percentiles in milliseconds per stage."""
+        with self._lock:
+            samples = {stage: sorted(values) for stage, values in self.samples.items()}
+            last = dict(self.last)
+        return {
+            stage: {
+                "count": len(values),
+                "last": last.get(stage),
+                "p50": get_percentile(values, 50),
+                "p90": get_percentile(values, 90),
+                "p99": get_percentile(values, 99),
+                "max": values[-1],
+            }
+            for stage, values in samples.items()
+        }
+
+    def get_totals(self) -> dict:
+        """Return count and sum in milliseconds per stage since start."""
+        with self._lock:
+            return dict(self.totals)
+
+
+def get_percentile(values, percent):
+    """Nearest rank percentile of sorted values."""
+    if not values:
+        return None
+    rank = math.ceil(percent / 100 * len(values)) - 1
+    return values[max(0, min(len(values) - 1, rank))]
+
+
+class RenderJob:
+    """A queued render of one location, replaced by newer jobs for the same key."""
+
+    def __init__(self, key, target, args):
+        self.key = key
+        self.target = target
+        self.args = args
+        self.future = concurrent.futures.Future()
+        self.queued = timer.perf_counter()
+
+
+class RenderQueue:
+    """Bounded render workers shared by all locations.
+
+    Only the latest job per location is kept while waiting, a location is
+    rendered by one worker at a time and the oldest waiting job is dropped
+    when the queue is full. Submitting never blocks, callers get a future.
+    """
+
+    def __init__(self, workers=2, maxsize=16, name=API_NAME):
+        self.workers = workers
+        self.maxsize = maxsize
+        self.name = name
+        self.timings = StageTimings()
+        self.counters = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "superseded": 0,
+            "dropped": 0,
+        }
+        self._pending = OrderedDict()
+        self._running = set()
+        self._threads = []
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def submit(self, key, target, *args) -> concurrent.futures.Future:
+        """Queue target(*args) for key, replacing a job still waiting for it."""
+        job = RenderJob(key, target, args)
+        with self._cond:
+            if self._closed:
+                job.future.cancel()
+                return job.future
+            self.counters["submitted"] += 1
+            old = self._pending.pop(key, None)
+            if old is not None:
+                self.counters["superseded"] += 1
+                old.future.cancel()
+            elif len(self._pending) >= self.maxsize:
+                _, oldest = self._pending.popitem(last=False)
+                _LOGGER.debug(f"Render queue full, dropping job for {oldest.key}.")
+                self.counters["dropped"] += 1
+                oldest.future.cancel()
+            self._pending[key] = job
+            if len(self._threads) < min(self.workers, len(self._pending)):
+                self._start_worker()
+            self._cond.notify()
+        return job.future
+
+    def cancel(self, key):
+        """Drop the waiting job of key, a running one is left to finish."""
+        with self._cond:
+            job = self._pending.pop(key, None)
+        if job is not None:
+            job.future.cancel()
+
+    def _start_worker(self):
+        thread = threading.Thread(
+            target=self._work,
+            name=f"{self.name}_render_{len(self._threads)}",
+            daemon=True,
         )
+        self._threads.append(thread)
+        thread.start()
+
+    def _next_job(self):
+        # Skip keys being rendered so jobs for one location stay in order
+        for key, job in self._pending.items():
+            if key not in self._running:
+                return self._pending.pop(key)
+        return None
+
+    def _work(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None and not self._closed:
+                    self._cond.wait()
+                    job = self._next_job()
+                if job is None:
+                    return
+                self._running.add(job.key)
+            if job.future.set_running_or_notify_cancel():
+                started = timer.perf_counter()
+                self.timings.record("wait", started - job.queued)
+                try:
+                    result = job.target(*job.args)
+                except BaseException as e:  # pylint: disable=broad-except
+                    _LOGGER.warning(f"Render job for {job.key} failed: {e}")
+                    job.future.set_exception(e)
+                    failed = True
+                else:
+                    job.future.set_result(result)
+                    failed = False
+                self.timings.record("render", timer.perf_counter() - started)
+            else:
+                failed = None
+            with self._cond:
+                self._running.discard(job.key)
+                if failed is not None:
+                    self.counters["failed" if failed else "completed"] += 1
+                # A newer job for this key may wait for this one to finish
+                self._cond.notify_all()
+
+    def close(self, wait=False):
+        """Stop the workers and cancel every waiting job."""
+        with self._cond:
+            self._closed = True
+            pending = list(self._pending.values())
+            self._pending.clear()
+            self._cond.notify_all()
+            threads = list(self._threads)
+        for job in pending:
+            job.future.cancel()
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def stats(self) -> dict:
+        """Return queue depth, counters and latency percentiles in milliseconds."""
+        with self._cond:
+            stats = {
+                "depth": len(self._pending),
+                "running": len(self._running),
+                "workers": len(self._threads),
+                "max_workers": self.workers,
+                "maxsize": self.maxsize,
+                **self.counters,
+            }
+        stats["latency"] = self.timings.summary()
+        return stats
+
+
+def init_render_worker():
+    """Load icons and text masks once per render process."""
+    WEATHER_ICONS.prewarm()
+    get_text_atlas()
+
+
+def render_columns_png(columns, profile="default", tiles=True):
+    """Render image columns and return the encoded png, used in worker processes."""
+    image = image_create_strip(columns, get_text_atlas(), COLUMN_TILES if tiles else None)
+    try:
+        return image_encode_png(image, profile)
+    finally:
+        image.close()
+
+
+class ProcessRenderPool:
+    """Render images in worker processes to use more than one core.
+
+    Jobs only carry the image columns and a png profile, workers keep icons,
+    text masks and column tiles warm between jobs and return png bytes.
+    """
+
+    def __init__(self, processes=None):
+        self.processes = processes or os.cpu_count() or 1
+        self._executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_render_worker,
+        )
+
+    def submit(self, columns, profile="default", tiles=True) -> concurrent.futures.Future:
+        return self._executor.submit(render_columns_png, columns, profile, tiles)
+
+    def render(self, columns, profile="default") -> bytes:
+        """Render in a worker process, blocking the calling thread."""
+        return self.submit(columns, profile).result()
+
+    def close(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def timing_trace_config() -> aiohttp.TraceConfig:
+    """Record dns and connect spans to the timings passed as trace_request_ctx.
+
+    Only for sessions owned by the command line, Home Assistant shares its
+    session between integrations.
+    """
+
+    def get_timings(trace_config_ctx):
+        ctx = trace_config_ctx.trace_request_ctx
+        if isinstance(ctx, dict):
+            return ctx.get("timings", None)
+        return None
+
+    def start(name):
+        async def on_start(session, trace_config_ctx, params):
+            setattr(trace_config_ctx, name, timer.perf_counter())
+
+        return on_start
+
+    def end(name):
+        async def on_end(session, trace_config_ctx, params):
+            timings = get_timings(trace_config_ctx)
+            started = getattr(trace_config_ctx, name, None)
+            if timings is not None and started is not None:
+                timings.record(name, timer.perf_counter() - started)
+
+        return on_end
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_dns_resolvehost_start.append(start("dns"))
+    trace_config.on_dns_resolvehost_end.append(end("dns"))
+    trace_config.on_connection_create_start.append(start("connect"))
+    trace_config.on_connection_create_end.append(end("connect"))
+    return trace_config
 
 
 class Location:
@@ -344,12 +1059,16 @@ class Location:
         self.met_units = {}
         self.units = {}
         self.time_series = []
+        self.derived = None
 
     def coordinates(self):
         return (self.latitude, self.longitude)
 
+    def key(self):
+        return f"{self.latitude},{self.longitude},{self.altitude}"
+
     def get_timeserie_time(self, time: dt.datetime):
-        for i in range(len(self.time_series)):
+        for i in range(len(self.time_series) - 1):
             if time > self.time_series[i].time and time < self.time_series[i + 1].time:
                 return self.time_series[i]
         return None
@@ -417,6 +1136,18 @@ class Timeserie:
     def get_intervals_hourly_data(self, data="all"):
         return self.get_intervals_data([CONST_INTERVAL_INST, CONST_INTERVAL_1H], data)
 
+    def get_intervals_image_data(self, data="all"):
+        """Hourly data, or the shortest period summary later in the forecast.
+
+        Entries after about 60 hours have no hourly interval, their symbol,
+        precipitation and probabilities are in the 6 or 12 hour intervals.
+        """
+        for intervaltype in (CONST_INTERVAL_1H, CONST_INTERVAL_6H, CONST_INTERVAL_12H):
+            interval = self.get_interval(intervaltype)
+            if interval is not None and interval.data is not None:
+                return self.get_intervals_data([CONST_INTERVAL_INST, intervaltype], data)
+        return self.get_intervals_data([CONST_INTERVAL_INST], data)
+
 
 class Interval:
     def __init__(self, timeserie, type, data):
@@ -441,13 +1172,20 @@ class Interval:
     def add_calculated_data(self, data):
         if data is not None:
             calc = {}
+            derived = self.timeserie.location.derived
             if "wind_speed" in data.keys():
                 wind_speed_ms = data.get("wind_speed")
-                bf = get_wind_ms_beaufort(wind_speed_ms)
-                calc["wind_speed_bf"] = bf
-                calc["wind_speed_bf_desc"] = CONST_BEAUFORT_EN[bf]
-                calc["wind_speed_knot"] = get_wind_ms_to_knot(wind_speed_ms)
-            if "wind_from_direction" in data.keys():
+                if derived is None or not derived.isdisjoint(
+                    ("wind_speed_bf", "wind_speed_bf_desc")
+                ):
+                    bf = get_wind_ms_beaufort(wind_speed_ms)
+                    calc["wind_speed_bf"] = bf
+                    calc["wind_speed_bf_desc"] = CONST_BEAUFORT_EN[bf]
+                if derived is None or "wind_speed_knot" in derived:
+                    calc["wind_speed_knot"] = get_wind_ms_to_knot(wind_speed_ms)
+            if "wind_from_direction" in data.keys() and (
+                derived is None or "wind_from_direction_cardinal" in derived
+            ):
                 wind_dir = data.get("wind_from_direction")
                 calc["wind_from_direction_cardinal"] = get_compass(wind_dir)
             return {**data, **calc}
@@ -464,9 +1202,12 @@ class Interval:
             "time": self.timeserie.time,
         }
         found_data = {}
-        if data == "all":
+        if self.data is None:
+            # Later entries of the forecast have no hourly interval
+            pass
+        elif data == "all":
             found_data = {**self.data}
-        elif self.data is not None:
+        else:
             if isinstance(data, str):
                 found_data = {data: self.data.get(data, None)}
             elif isinstance(data, list):
@@ -496,7 +1237,9 @@ _LOGGER = logging.getLogger(API_NAME)
 
 
 class MetController:
-    def __init__(self, latitude, longitude, session, place=None) -> None:
+    def __init__(
+        self, latitude, longitude, session, place=None, base_url=API_BASE_URL
+    ) -> None:
 
         """Sample API Client."""
         self.config = {}
@@ -508,6 +1251,7 @@ class MetController:
             longitude=self.lon,
             place=self.place,
             session=session,
+            base_url=base_url,
         )
         self.readconfig()
 
@@ -571,23 +1315,78 @@ class MetController:
 def parse_arguments():
     """Argument parser for running API separately."""
     parser = argparse.ArgumentParser(description=f"{API_NAME}: {API_ATTRIBUTION}")
+    parser.add_argument("-lat", "--latitude", help="Latitude", type=float)
+    parser.add_argument("-lon", "--longitude", help="Longitude", type=float)
+    parser.add_argument("-p", "--place", help="Place name", required=False, type=str)
     parser.add_argument(
-        "-lat", "--latitude", help="Latitude", required=True, type=float
+        "-s", "--show", help="Show plot", required=False, action="store_true"
     )
     parser.add_argument(
-        "-lon", "--longitude", help="Longitude", required=True, type=float
+        "-l", "--loop", help="Loop every 10 seconds", action="store_true"
     )
-    parser.add_argument("-p", "--place", help="Place name", required=False, type=str)
     parser.add_argument(
-        "-s", "--show", help="Show plot", required=False, action="store_true"
+        "-d", "--daemon", help="Refresh on expiry and serve over http", action="store_true"
     )
     parser.add_argument(
-        "-l", "--loop", help="Loop every 10 seconds", action="store_true"
+        "--locations", help="Json file with a list of locations for daemon mode", type=str
+    )
+    parser.add_argument("--host", help="Daemon http host", default=DAEMON_HOST)
+    parser.add_argument("--port", help="Daemon http port", default=DAEMON_PORT, type=int)
+    parser.add_argument(
+        "--base-url", help="Api base url, e.g. a caching proxy", default=API_BASE_URL
+    )
+    parser.add_argument(
+        "--profile",
+        help="Profile cpu and memory of a number of update cycles",
+        metavar="CYCLES",
+        type=int,
+    )
+    parser.add_argument(
+        "--refetch",
+        help="Fetch from the api in every profiled cycle instead of replaying the payload",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--batch",
+        help="Csv file of place,latitude,longitude[,altitude], processed on a thread per cpu",
+    )
+    parser.add_argument("--replay", help="Directory or file of recorded api responses (.json, .json.gz)")
+    parser.add_argument("-o", "--output", help="Batch or replay output file, - for stdout")
+    parser.add_argument(
+        "--format",
+        help="Batch output as ndjson lines or csv rows, from --output if not set",
+        choices=["ndjson", "csv"],
+    )
+    parser.add_argument(
+        "--concurrency", help="Batch requests in flight", default=BATCH_CONCURRENCY, type=int
+    )
+    parser.add_argument(
+        "--rate", help="Batch requests per second, 0 for no limit", default=BATCH_RATE, type=float
+    )
+    parser.add_argument("--image-dir", help="Save batch or replay images to this directory")
+    parser.add_argument(
+        "--render-processes",
+        help="Render png images in this many worker processes",
+        default=0,
+        type=int,
     )
     args = parser.parse_args()
+    if args.locations is None and args.batch is None and args.replay is None and (
+        args.latitude is None or args.longitude is None
+    ):
+        parser.error(
+            "--latitude and --longitude are required without --locations, --batch or --replay"
+        )
     return args
 
 
+def create_render_pool(args) -> Optional[ProcessRenderPool]:
+    """Process pool of --render-processes, None to render in this process."""
+    if args.render_processes > 0:
+        return ProcessRenderPool(args.render_processes)
+    return None
+
+
 def image_margin(pil_img, top=0, right=0, bottom=0, left=0, color=(255, 255, 255)):
     width, height = pil_img.size
     new_width = width + right + left
@@ -607,17 +1406,271 @@ def image_combine_right(im1, im2):
 
 
 def image_list_combine(images):
-    newimage = None
-    previmage = None
+    """Paste images side by side into one canvas sized up front."""
+    if not images:
+        return None
+    width = sum(image.size[0] for image in images)
+    newimage = Image.new(
+        images[0].mode, size=(width, images[0].size[1]), color=(255, 255, 255)
+    )
+    x = 0
     for image in images:
-        if previmage is not None:
-            newimage = image_combine_right(newimage, image)
-        else:
-            newimage = image
-        previmage = image
+        newimage.paste(image, (x, 0))
+        x += image.size[0]
+    return newimage
+
+
+def image_column_size(imagedata, weathersymbol=None):
+    """Return the size of a forecast column, icon and one text line per value."""
+    if weathersymbol is None:
+        weathersymbol = get_weather_symbol(imagedata.get("symbol_code"))
+    return (
+        weathersymbol.size[0] + 25,
+        weathersymbol.size[1] + 0 + len(imagedata) * 30,
+    )
+
+
+def image_layout(columns):
+    """Return strip size and the box of each column, computed from the data."""
+    boxes = []
+    width = 0
+    height = None
+    for imagedata in columns:
+        column_width, column_height = image_column_size(imagedata)
+        if height is None:
+            # Columns share keys, the strip takes the height of the first
+            height = column_height
+        boxes.append((width, 0, width + column_width, height))
+        width += column_width
+    return (width, height or 0), boxes
+
+
+def image_create_strip(columns, font, tiles=None):
+    """Draw every column directly into one preallocated canvas.
+
+    With a tile cache, columns rendered before are pasted from the cache and
+    only new columns are drawn.
+    """
+    _LOGGER.debug(f"Creating weather image strip with {len(columns)} columns.")
+    size, boxes = image_layout(columns)
+    newimage = Image.new("RGBA", size=size, color=(255, 255, 255))
+    draw = ImageDraw.Draw(newimage)
+    for i, (imagedata, box) in enumerate(zip(columns, boxes)):
+        key = None
+        if tiles is not None:
+            key = get_column_key(imagedata, font)
+            tile = tiles.get(key)
+            if tile is not None:
+                newimage.paste(tile, box[:2])
+                continue
+        if i > 0:
+            # Clear text overflowing from the previous column, as if clipped
+            newimage.paste((255, 255, 255), box)
+        image_draw_column(newimage, draw, box[:2], imagedata, font)
+        if key is not None:
+            tiles.put(key, newimage.crop(box))
+    draw = None
     return newimage
 
 
+def write_file_atomic(filename, content: bytes):
+    """Write to a temporary file in the same directory and rename it in place."""
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmpname = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(content)
+        os.replace(tmpname, filename)
+    except BaseException:
+        try:
+            os.unlink(tmpname)
+        except OSError:
+            pass
+        raise
+
+
+def get_column_key(imagedata, font):
+    """Content hash of a column, its values in drawing order and the font."""
+    content = repr((id(font), tuple(imagedata.items())))
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+class ColumnTileCache:
+    """Process wide LRU of rendered columns, bounded by pixel bytes."""
+
+    def __init__(self, max_bytes=32 * 2**20):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.tiles = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            tile = self.tiles.get(key, None)
+            if tile is None:
+                self.misses += 1
+                return None
+            self.tiles.move_to_end(key)
+            self.hits += 1
+            return tile
+
+    def put(self, key, tile):
+        size = get_image_bytes(tile)
+        with self._lock:
+            if key in self.tiles or size > self.max_bytes:
+                return
+            self.tiles[key] = tile
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, old = self.tiles.popitem(last=False)
+                self.bytes -= get_image_bytes(old)
+
+    def clear(self):
+        with self._lock:
+            self.tiles.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self.tiles),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+def get_image_bytes(image):
+    return image.size[0] * image.size[1] * len(image.getbands())
+
+
+COLUMN_TILES = ColumnTileCache()
+
+# Png encoder settings, quantize reduces the strip to an adaptive 8-bit palette
+CONST_PNG_PROFILES = {
+    "default": {},
+    "fast": {"compress_level": 1},
+    "small": {"compress_level": 9, "optimize": True},
+    "palette": {"quantize": 256, "quantize_method": Image.MEDIANCUT},
+    "palette_fast": {"quantize": 256, "quantize_method": Image.FASTOCTREE},
+    "palette_small": {
+        "compress_level": 9,
+        "optimize": True,
+        "quantize": 256,
+        "quantize_method": Image.MEDIANCUT,
+    },
+}
+
+
+def image_encode_png(image, profile="default"):
+    """Encode image as png with the settings of a profile."""
+    settings = dict(CONST_PNG_PROFILES.get(profile, CONST_PNG_PROFILES["default"]))
+    colors = settings.pop("quantize", None)
+    method = settings.pop("quantize_method", Image.MEDIANCUT)
+    if colors:
+        # The strip is opaque, quantize the colours only
+        image = image.convert("RGB").quantize(colors=colors, method=method, dither=Image.NONE)
+    output = io.BytesIO()
+    image.save(output, "png", **settings)
+    return output.getvalue()
+
+
+CONST_IMAGE_FORMATS = {"png": "PNG", "webp": "WEBP", "jpeg": "JPEG"}
+
+
+def get_image_format(image_format=None):
+    """Return a supported output format, falling back to png."""
+    if image_format not in CONST_IMAGE_FORMATS:
+        return "png"
+    if image_format == "webp" and not features.check("webp"):
+        _LOGGER.warning("Pillow is built without WebP support, using png.")
+        return "png"
+    return image_format
+
+
+def get_variant_size(size, width=None, height=None):
+    """Fit size within the requested width and/or height, never enlarging."""
+    scale = 1.0
+    if width:
+        scale = min(scale, width / size[0])
+    if height:
+        scale = min(scale, height / size[1])
+    if scale >= 1.0:
+        return size
+    return (max(1, round(size[0] * scale)), max(1, round(size[1] * scale)))
+
+
+def image_create_variant(image: bytes, width=None, height=None, image_format="png"):
+    """Decode image bytes, shrink them to the requested size and encode again."""
+    with Image.open(io.BytesIO(image)) as source:
+        size = get_variant_size(source.size, width, height)
+        if size != source.size and source.mode == "P":
+            # Pillow resizes palette images with nearest neighbour, which
+            # breaks the text. The strip is opaque, resample the colours and
+            # keep the palette for png.
+            newimage = source.convert("RGB").resize(size, Image.LANCZOS)
+            if image_format == "png":
+                newimage = newimage.quantize(
+                    colors=256, method=Image.MEDIANCUT, dither=Image.NONE
+                )
+        elif size != source.size:
+            newimage = source.resize(size, Image.LANCZOS)
+        else:
+            newimage = source.copy()
+    if image_format == "jpeg" and newimage.mode != "RGB":
+        # Jpeg has no alpha channel, the forecast strip has a white background
+        newimage = newimage.convert("RGB")
+    output = io.BytesIO()
+    newimage.save(output, CONST_IMAGE_FORMATS[image_format])
+    newimage.close()
+    return output.getvalue()
+
+
+class ImageVariantCache:
+    """LRU of encoded image variants keyed by content hash, size and format."""
+
+    def __init__(self, maxsize=8):
+        self.maxsize = maxsize
+        self.variants = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            variant = self.variants.get(key, None)
+            if variant is None:
+                self.misses += 1
+                return None
+            self.variants.move_to_end(key)
+            self.hits += 1
+            return variant
+
+    def put(self, key, variant: bytes):
+        with self._lock:
+            self.variants[key] = variant
+            self.variants.move_to_end(key)
+            while len(self.variants) > self.maxsize:
+                self.variants.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self.variants.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self.variants),
+                "bytes": sum(len(v) for v in self.variants.values()),
+                "maxsize": self.maxsize,
+            }
+
+
 def image_create_process_data(time, data, units, datafilter=CONST_IMAGEVALUES):
     _LOGGER.debug("Processing data for image creation.")
     imagedata = {}
@@ -636,6 +1689,9 @@ def image_create_process_data(time, data, units, datafilter=CONST_IMAGEVALUES):
             imagedata[key] = f"{data.get(key, 'N/A')}"
 
     # Special treatment
+    if data.get("symbol_code", None) is None:
+        # Blank icon like the legend instead of looking up "N/A"
+        imagedata["symbol_code"] = None
     if "wind_speed" in imagedata.keys() and "wind_speed_of_gust" in imagedata.keys():
         imagedata.pop("wind_speed_of_gust")
         windspeed = data.get("wind_speed")
@@ -656,34 +1712,220 @@ def image_create(imagedata, font):
     _LOGGER.debug("Creating weather image.")
     weathersymbol = get_weather_symbol(imagedata.get("symbol_code"))
 
-    newwidth = weathersymbol.size[0] + 25
-    newheight = weathersymbol.size[1] + 0 + len(imagedata) * 30
     newimage = Image.new(
         weathersymbol.mode,
-        size=(newwidth, newheight),
+        size=image_column_size(imagedata, weathersymbol),
         color=(255, 255, 255),
     )
-    newimage.paste(weathersymbol, (0, 20), weathersymbol)
-
     draw = ImageDraw.Draw(newimage)
-    textcolor = (0, 0, 0)
+    image_draw_column(newimage, draw, (0, 0), imagedata, font, weathersymbol)
+    draw = None
+    return newimage
 
-    draw.text(xy=(30, 0), text=imagedata.get("time"), fill=textcolor, font=font)
+
+def image_draw_column(image, draw, offset, imagedata, font, weathersymbol=None):
+    """Draw icon and values of one column at offset of an existing image."""
+    if weathersymbol is None:
+        weathersymbol = get_weather_symbol(imagedata.get("symbol_code"))
+    x, y = offset
+    image.paste(weathersymbol, (x, y + 20), weathersymbol)
+
+    textcolor = (0, 0, 0)
+    image_draw_text(image, draw, (x + 30, y), imagedata.get("time"), textcolor, font)
     dropdata = ["time", "date", "symbol_code"]
 
-    height = 250
+    height = y + 250
     for key, val in imagedata.items():
         if key not in dropdata:
-            draw.text(xy=(30, height), text=val, fill=textcolor, font=font)
+            image_draw_text(image, draw, (x + 30, height), val, textcolor, font)
             height += 27
-    draw = None
-    return newimage
 
 
-def weatherimage_font():
+def image_create_svg(columns, font_size=25):
+    """Return the forecast strip as svg with the same layout as the png strip.
+
+    Each distinct icon is embedded once as a symbol and placed with use,
+    columns are nested svg elements so long text is clipped like in png.
+    """
+    (width, height), boxes = image_layout(columns)
+    ascent, line_height = get_svg_text_metrics(font_size)
+    dropdata = ["time", "date", "symbol_code"]
+    symbols = set()
+    parts = []
+    for imagedata, (x0, y0, x1, y1) in zip(columns, boxes):
+        parts.append(f'<svg x="{x0}" y="{y0}" width="{x1 - x0}" height="{y1 - y0}">')
+        symbol_code = imagedata.get("symbol_code")
+        if symbol_code is not None and get_weather_symbol_svg(symbol_code):
+            symbols.add(symbol_code)
+            icon_width, icon_height = get_weather_symbol(symbol_code).size
+            parts.append(
+                f'<use href="#icon-{symbol_code}" x="0" y="20" '
+                f'width="{icon_width}" height="{icon_height}"/>'
+            )
+        parts.append(svg_text(30, ascent, imagedata.get("time"), line_height))
+        y = 250 + ascent
+        for key, val in imagedata.items():
+            if key not in dropdata:
+                parts.append(svg_text(30, y, val, line_height))
+                y += 27
+        parts.append("</svg>")
+
+    defs = "".join(get_weather_symbol_svg(symbol) for symbol in sorted(symbols))
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" '
+        f'width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" preserveAspectRatio="xMinYMin meet" '
+        f'font-family="Noto Sans, sans-serif" font-size="{font_size}" fill="#000">'
+        f"<defs>{defs}</defs>"
+        f'<rect width="100%" height="100%" fill="#fff"/>'
+        + "".join(parts)
+        + "</svg>"
+    )
+
+
+def svg_text(x, y, text, line_height):
+    """Svg text element with one tspan per line, y is the first baseline."""
+    if text is None:
+        return ""
+    lines = [xml_escape(line) for line in str(text).split("\n")]
+    if len(lines) == 1:
+        return f'<text x="{x}" y="{y}">{lines[0]}</text>'
+    tspans = "".join(
+        f'<tspan x="{x}" dy="{line_height if i else 0}">{line}</tspan>'
+        for i, line in enumerate(lines)
+    )
+    return f'<text x="{x}" y="{y}">{tspans}</text>'
+
+
+@functools.lru_cache(maxsize=8)
+def get_svg_text_metrics(font_size=25):
+    """Ascent and multiline spacing of the image font, matching Pillow."""
+    font = weatherimage_font(font_size)
+    try:
+        ascent = font.getmetrics()[0]
+        line_height = font.getbbox("A")[3] + 4
+    except AttributeError:
+        ascent, line_height = font_size, font_size + 4
+    return ascent, line_height
+
+
+@functools.lru_cache(maxsize=128)
+def get_weather_symbol_svg(symbol_code):
+    """Return the vector icon as a nested svg with ids scoped to the symbol."""
+    try:
+        icon = WEATHER_ICONS.read(f"svg/{symbol_code}.svg").decode("utf-8")
+    except (KeyError, OSError, UnicodeDecodeError) as e:
+        _LOGGER.debug(f"No vector icon for '{symbol_code}' ({e})")
+        return ""
+    icon = re.sub(r"<\?xml[^>]*\?>", "", icon).strip()
+    # Icons reuse ids like "sun", prefix them so icons do not collide
+    icon = re.sub(r'\bid="([^"]+)"', rf'id="{symbol_code}-\1"', icon)
+    icon = re.sub(r"url\(#([^)]+)\)", rf"url(#{symbol_code}-\1)", icon)
+    icon = re.sub(r'href="#([^"]+)"', rf'href="#{symbol_code}-\1"', icon)
+    icon = re.sub(r'<svg\b[^>]*?(viewBox="[^"]*")[^>]*>', rf'<svg id="icon-{symbol_code}" \1>', icon, count=1)
+    return icon
+
+
+def is_svg(image: bytes):
+    return image.lstrip()[:4] == b"<svg"
+
+
+def image_draw_text(image, draw, xy, text, fill, font):
+    """Draw text with a TextAtlas if given, otherwise through FreeType."""
+    if isinstance(font, TextAtlas):
+        font.draw(image, xy, text, fill)
+    else:
+        draw.text(xy=xy, text=text, fill=fill, font=font)
+
+
+class TextAtlas:
+    """Process wide cache of rasterised text masks for one font."""
+
+    def __init__(self, font, maxsize=512):
+        self.font = font
+        self.maxsize = maxsize
+        self.masks = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._measure = ImageDraw.Draw(Image.new("L", (1, 1)))
+
+    def get_mask(self, text):
+        """Return offset and L-mode mask of text, rendering it on first use."""
+        with self._lock:
+            cached = self.masks.get(text, None)
+            if cached is not None:
+                self.masks.move_to_end(text)
+                self.hits += 1
+                return cached
+
+            # FreeType faces are not shared between threads, render under lock
+            self.misses += 1
+            x0, y0, x1, y1 = self._measure.textbbox((0, 0), text, font=self.font)
+            mask = Image.new("L", (max(1, x1 - x0), max(1, y1 - y0)), 0)
+            ImageDraw.Draw(mask).text((-x0, -y0), text, fill=255, font=self.font)
+            cached = ((x0, y0), mask)
+            self.masks[text] = cached
+            while len(self.masks) > self.maxsize:
+                self.masks.popitem(last=False)
+            return cached
+
+    def draw(self, image, xy, text, fill):
+        """Paste fill through the cached mask of text at xy."""
+        if text is None:
+            return
+        (x0, y0), mask = self.get_mask(text)
+        image.paste(fill, (xy[0] + x0, xy[1] + y0), mask)
+
+    def prewarm(self, texts=None):
+        if texts is None:
+            texts = get_text_vocabulary()
+        for text in texts:
+            self.get_mask(text)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self.masks),
+                "maxsize": self.maxsize,
+            }
+
+
+_TEXT_ATLASES = {}
+_TEXT_ATLASES_LOCK = threading.Lock()
+
+
+def get_text_atlas(size=25) -> TextAtlas:
+    """Return the process wide text atlas for a font size, creating it once."""
+    with _TEXT_ATLASES_LOCK:
+        atlas = _TEXT_ATLASES.get(size, None)
+        if atlas is None:
+            atlas = _TEXT_ATLASES[size] = TextAtlas(weatherimage_font(size))
+            atlas.prewarm()
+        return atlas
+
+
+def get_text_atlas_stats() -> dict:
+    with _TEXT_ATLASES_LOCK:
+        return {size: atlas.stats() for size, atlas in _TEXT_ATLASES.items()}
+
+
+def get_text_vocabulary():
+    """Labels that show up in every image, rendered when an atlas is created."""
+    texts = ["N/A"]
+    texts += list(dict.fromkeys(CONST_WEATHERDATA.values()))
+    texts += [f"{desc} {bf}" for bf, desc in CONST_BEAUFORT_EN.items()]
+    texts += CONST_COMPASS_POINTS
+    texts += [f"{hour:02d}:00" for hour in range(24)]
+    return texts
+
+
+def weatherimage_font(size=25):
     font = None
     try:
-        font = ImageFont.truetype(CONST_FILE_FONT, 25)
+        font = ImageFont.truetype(CONST_FILE_FONT, size)
         _LOGGER.debug(f"Loaded font {CONST_FILE_FONT} {font}.")
     # except (TypeError, FileNotFoundError, OSError) as e:
     except Exception as e:
@@ -701,6 +1943,79 @@ def weatherimage_font():
     return font
 
 
+class WeatherPlot:
+    """Forecast chart on its own Agg figure, reused between renders.
+
+    Pyplot keeps global state and is not safe in executor threads, the figure
+    is created without it and the lines get new data on every render.
+    """
+
+    def __init__(self, size=(8, 6), dpi=100):
+        self.figure = Figure(figsize=size, dpi=dpi)
+        FigureCanvasAgg(self.figure)
+        self.figure.subplots_adjust(hspace=0.15)
+        self.renders = 0
+        self._lock = threading.Lock()
+        ax_temp, ax_precip, ax_wind = self.figure.subplots(3, 1, sharex=True)
+        self.axes = {
+            "air_temperature": ax_temp,
+            "precipitation_amount": ax_precip,
+            "wind_speed": ax_wind,
+        }
+        self.lines = {
+            "air_temperature": ax_temp.plot(
+                [], [], color="red", linewidth=2, label="Temperature"
+            )[0],
+            "precipitation_amount": ax_precip.step(
+                [], [], where="post", color="blue", linewidth=2, label="Precipitation"
+            )[0],
+            "wind_speed": ax_wind.plot(
+                [], [], color="green", linewidth=2, label="Wind speed"
+            )[0],
+            "wind_speed_of_gust": ax_wind.plot(
+                [], [], color="darkorange", linewidth=2, linestyle="--", label="Wind gusts"
+            )[0],
+        }
+        for ax in (ax_temp, ax_precip, ax_wind):
+            ax.xaxis_date()
+            ax.grid(True, alpha=0.3)
+            ax.legend(loc="upper left", fontsize=8)
+        self.title = ax_temp.set_title("")
+
+    def render(self, data, location_name="LOCATION", units=None) -> bytes:
+        """Update the lines with data and return the chart as png."""
+        units = units or {}
+        x = mdates.date2num([d.get("time") for d in data])
+        with self._lock:
+            for key, line in self.lines.items():
+                # Missing values are left out instead of drawn as zero
+                points = [
+                    (xi, float(d[key])) for xi, d in zip(x, data) if d.get(key) is not None
+                ]
+                line.set_data([xi for xi, _ in points], [yi for _, yi in points])
+            for key, ax in self.axes.items():
+                ax.set_ylabel(units.get(key, "") or "")
+                ax.relim()
+                ax.autoscale_view()
+            # Keep a visible precipitation axis on dry days
+            self.axes["precipitation_amount"].set_ylim(
+                0, max([1.0, *self.lines["precipitation_amount"].get_ydata()])
+            )
+            now = dt_now()
+            self.axes["wind_speed"].xaxis.set_major_formatter(
+                mdates.DateFormatter("%H:%M", tz=now.tzinfo)
+            )
+            self.title.set_text(f"Weather for {location_name}")
+            output = io.BytesIO()
+            self.figure.savefig(output, format="png")
+            self.renders += 1
+        return output.getvalue()
+
+    def close(self):
+        with self._lock:
+            self.figure.clear()
+
+
 def plot_weatherdata(data, filename=None, show=False, location_name="LOCATION"):
     _LOGGER.debug("Creating plot")
     x = []
@@ -803,21 +2118,94 @@ def plot_weatherdata(data, filename=None, show=False, location_name="LOCATION"):
 #         )
 
 
+class WeatherIconCache:
+    """Process wide LRU of decoded icons, read by offset from the tar archive."""
+
+    def __init__(self, filename=CONST_FILE_WEATHERICONS, maxsize=64):
+        self.filename = filename
+        self.maxsize = maxsize
+        self.index = None
+        self.icons = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def load_index(self):
+        """Map member names to data offset and size, scanning the tar once."""
+        with self._lock:
+            if self.index is None:
+                _LOGGER.debug(f"Indexing weather icons in {self.filename}")
+                with tarfile.open(self.filename) as tar:
+                    self.index = {
+                        member.name: (member.offset_data, member.size)
+                        for member in tar.getmembers()
+                        if member.isfile()
+                    }
+        return self.index
+
+    def read(self, name) -> bytes:
+        """Return raw bytes of an archive member, KeyError if missing."""
+        offset, size = self.load_index()[name]
+        with open(self.filename, "rb") as fp:
+            fp.seek(offset)
+            return fp.read(size)
+
+    def get(self, symbol) -> Image.Image:
+        """Return the decoded RGBA icon for a symbol code, shared - do not modify."""
+        with self._lock:
+            icon = self.icons.get(symbol, None)
+            if icon is not None:
+                self.icons.move_to_end(symbol)
+                self.hits += 1
+                return icon
+            self.misses += 1
+
+        icon = Image.open(io.BytesIO(self.read(f"png/{symbol}.png")))
+        icon.load()
+        if icon.mode != "RGBA":
+            icon = icon.convert("RGBA")
+
+        with self._lock:
+            self.icons[symbol] = icon
+            while len(self.icons) > self.maxsize:
+                self.icons.popitem(last=False)
+        return icon
+
+    def prewarm(self, symbols=CONST_WEATHERICONS_PREWARM):
+        for symbol in symbols:
+            try:
+                self.get(symbol)
+            except (KeyError, OSError) as e:
+                _LOGGER.debug(f"Could not pre-warm weather icon '{symbol}' ({e})")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self.icons),
+                "maxsize": self.maxsize,
+                "indexed": None if self.index is None else len(self.index),
+            }
+
+
+# The weather icons are licensed under the MIT License (MIT). Copyright (c) 2015-2017 Yr.no.
+WEATHER_ICONS = WeatherIconCache()
+
+CONST_WEATHERICON_DEFAULT = Image.new("RGBA", size=(200, 200), color=(255, 255, 255))
+
+
 def get_weather_symbol(weatherstr=None):
+    """Return a shared icon image for a symbol code, do not modify it."""
     if weatherstr is not None:
-        _LOGGER.debug(f"Trying to open tar archive looking for '{weatherstr}'")
         try:
-            # The weather icons are licensed under the MIT License (MIT). Copyright (c) 2015-2017 Yr.no.
-            fp = TarIO.TarIO(CONST_FILE_WEATHERICONS, f"png/{weatherstr}.png")
-            im = Image.open(fp)
-            return im
-        except OSError as e:
+            return WEATHER_ICONS.get(weatherstr)
+        except (KeyError, OSError) as e:
             _LOGGER.error(
                 f"Could not find file in tar archive ('{weatherstr}'), trying to return default image.\n {e}"
             )
             _LOGGER.debug(f"Filepath: {CONST_FILE_WEATHERICONS}")
-    default_im = Image.new("RGBA", size=(200, 200), color=(255, 255, 255))
-    return default_im
+    return CONST_WEATHERICON_DEFAULT
 
 
 def get_wind_ms_to_knot(speed_ms, decimal=1):
@@ -902,31 +2290,51 @@ CONST_BEAUFORT_EN = {
 }
 
 
+CONST_COMPASS_POINTS = [
+    "N",
+    "NNE",
+    "NE",
+    "ENE",
+    "E",
+    "ESE",
+    "SE",
+    "SSE",
+    "S",
+    "SSW",
+    "SW",
+    "WSW",
+    "W",
+    "WNW",
+    "NW",
+    "NNW",
+]
+
+
 def get_compass(bearing):
     if bearing is not None:
-        dirs = [
-            "N",
-            "NNE",
-            "NE",
-            "ENE",
-            "E",
-            "ESE",
-            "SE",
-            "SSE",
-            "S",
-            "SSW",
-            "SW",
-            "WSW",
-            "W",
-            "WNW",
-            "NW",
-            "NNW",
-        ]
+        dirs = CONST_COMPASS_POINTS
         ix = round(bearing / (360.0 / len(dirs)))
         return dirs[ix % len(dirs)]
     return None
 
 
+def validate_payload(payload) -> bool:
+    """Check that a payload looks like a locationforecast response."""
+    if not isinstance(payload, dict):
+        return False
+    props = payload.get("properties", None)
+    if not isinstance(props, dict):
+        return False
+    meta = props.get("meta", None)
+    if not isinstance(meta, dict) or not isinstance(meta.get("units", None), dict):
+        return False
+    timeseries = props.get("timeseries", None)
+    if not isinstance(timeseries, list) or len(timeseries) == 0:
+        return False
+    first = timeseries[0]
+    return isinstance(first, dict) and "time" in first and "data" in first
+
+
 def parse_http_date(text):
     try:
         # return dt.datetime(*eut.parsedate(text)[:6])
@@ -951,32 +2359,753 @@ def dt_strftime(dt_dt: dt.datetime, format=API_STRINGTIME) -> Optional[str]:
         _LOGGER.debug(f"{dt_dt} - PARSE ERROR: {e}")
 
 
+# Time returned by dt_now while replaying recorded payloads, None for wall clock
+_simulated_now: Optional[dt.datetime] = None
+
+
+def set_simulated_now(now: Optional[dt.datetime]):
+    """Let dt_now return a fixed time, or the wall clock again with None."""
+    global _simulated_now
+    _simulated_now = now
+
+
 def dt_now(time_zone: Optional[dt.tzinfo] = None) -> dt.datetime:
     """Get now in specified time zone."""
+    if _simulated_now is not None:
+        return _simulated_now.astimezone(time_zone or DEFAULT_TIME_ZONE)
     return dt.datetime.now(time_zone or DEFAULT_TIME_ZONE)
 
 
+DAEMON_HOST = "127.0.0.1"
+DAEMON_PORT = 8765
+DAEMON_MIN_INTERVAL = 60
+DAEMON_MAX_INTERVAL = 3600
+
+
+def get_location_slug(name):
+    """Url friendly location name."""
+    return re.sub(r"[^a-z0-9]+", "_", str(name).lower()).strip("_") or "location"
+
+
+def read_locations(filename):
+    """Read a json list of {place, latitude, longitude[, altitude]}."""
+    with open(filename, "r") as file:
+        return json.load(file)
+
+
+class ForecastDaemon:
+    """Refresh several locations on the Expires schedule and serve them over http.
+
+    Everything is served from memory: json of the latest data, the png strip
+    and prometheus style metrics at /metrics.
+    """
+
+    def __init__(
+        self,
+        session,
+        locations,
+        output_dir=CONST_DIR_DEFAULT,
+        base_url=API_BASE_URL,
+        render_pool=None,
+    ):
+        self.session = session
+        self.clients = {}
+        self.stats = {}
+        self._json = {}
+        self.requests = {}
+        for location in locations:
+            client = NorwegianWeatherApiClient(
+                location.get("place") or "Home",
+                location["latitude"],
+                location["longitude"],
+                session,
+                altitude=location.get("altitude", 0),
+                output_dir=output_dir,
+                save_image=False,
+                base_url=base_url,
+            )
+            client.render_pool = render_pool
+            slug = get_location_slug(client.location.name)
+            if slug in self.clients:
+                raise ValueError(
+                    f"Locations {self.clients[slug].location.name!r} and "
+                    f"{client.location.name!r} are both served as /{slug}, rename one"
+                )
+            self.clients[slug] = client
+            self.stats[slug] = {"refresh": 0, "errors": 0, "next_refresh": None}
+
+    def get_refresh_delay(self, client):
+        """Seconds until the data of client expires, within sane bounds."""
+        if client.expires is None:
+            return DAEMON_MIN_INTERVAL
+        delay = (client.expires - datetime.now(timezone.utc)).total_seconds()
+        return max(DAEMON_MIN_INTERVAL, min(DAEMON_MAX_INTERVAL, delay + 1))
+
+    async def refresh_loop(self, slug):
+        client = self.clients[slug]
+        stats = self.stats[slug]
+        while True:
+            try:
+                await client.async_get_data()
+                # api_wrapper logs and swallows request errors, leaving no data
+                if not validate_payload(client.yrdata):
+                    raise ValueError("no valid data from the api")
+                stats["refresh"] += 1
+            except Exception as e:  # pylint: disable=broad-except
+                _LOGGER.warning(f"Refresh of {slug} failed: {e}")
+                stats["errors"] += 1
+            delay = self.get_refresh_delay(client)
+            stats["next_refresh"] = timer.time() + delay
+            _LOGGER.debug(f"Next refresh of {slug} in {round(delay)} seconds.")
+            await asyncio.sleep(delay)
+
+    def get_json(self, slug):
+        """Serialized data of a location, encoded once per refresh."""
+        client = self.clients[slug]
+        key = (client.generation, client.timings.last.get("refresh"))
+        cached = self._json.get(slug, None)
+        if cached is None or cached[0] != key:
+            body = json.dumps(client.data, default=str).encode("utf-8")
+            cached = self._json[slug] = (key, body, hashlib.sha1(body).hexdigest())
+        return cached[1], cached[2]
+
+    def count_request(self, route):
+        self.requests[route] = self.requests.get(route, 0) + 1
+
+    def respond(self, request, body, content_type, etag):
+        headers = {"ETag": f'"{etag}"', "Cache-Control": "no-cache"}
+        if request.headers.get("If-None-Match") == headers["ETag"]:
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=body, content_type=content_type, headers=headers)
+
+    async def handle_index(self, request):
+        self.count_request("index")
+        return web.json_response(
+            {
+                slug: {
+                    "place": client.location.name,
+                    "json": f"/{slug}.json",
+                    "png": f"/{slug}.png",
+                    "expires": str(client.expires),
+                }
+                for slug, client in self.clients.items()
+            }
+        )
+
+    async def handle_json(self, request):
+        self.count_request("json")
+        slug = request.match_info["slug"]
+        if slug not in self.clients or not self.clients[slug].data:
+            raise web.HTTPNotFound()
+        body, etag = self.get_json(slug)
+        return self.respond(request, body, "application/json", etag)
+
+    async def handle_png(self, request):
+        self.count_request("png")
+        client = self.clients.get(request.match_info["slug"], None)
+        if client is None or client.image is None:
+            raise web.HTTPNotFound()
+        image, image_hash = client.image, client.image_hash
+        return self.respond(request, image, "image/png", image_hash)
+
+    async def handle_metrics(self, request):
+        self.count_request("metrics")
+        return web.Response(text=self.get_metrics(), content_type="text/plain")
+
+    def get_metrics(self) -> str:
+        """Prometheus text exposition of refreshes, timings and requests."""
+        families = {
+            "refresh_total": ("counter", []),
+            "refresh_errors_total": ("counter", []),
+            "expires_timestamp_seconds": ("gauge", []),
+            "generation": ("gauge", []),
+            "image_bytes": ("gauge", []),
+            "stage_milliseconds": ("summary", []),
+            "http_requests_total": ("counter", []),
+        }
+        for slug, client in self.clients.items():
+            label = f'location="{slug}"'
+            stats = self.stats[slug]
+            families["refresh_total"][1].append(("", label, stats["refresh"]))
+            families["refresh_errors_total"][1].append(("", label, stats["errors"]))
+            if client.expires is not None:
+                families["expires_timestamp_seconds"][1].append(
+                    ("", label, client.expires.timestamp())
+                )
+            families["generation"][1].append(("", label, client.generation))
+            families["image_bytes"][1].append(("", label, len(client.image or b"")))
+            totals = client.timings.get_totals()
+            for stage, summary in client.timings.summary().items():
+                stage_label = f'{label},stage="{stage}"'
+                for key, quantile in (("p50", "0.5"), ("p90", "0.9"), ("p99", "0.99")):
+                    families["stage_milliseconds"][1].append(
+                        ("", f'{stage_label},quantile="{quantile}"', summary[key])
+                    )
+                # Quantiles are over the recent samples, sum and count since start
+                count, total = totals.get(stage, (0, 0.0))
+                families["stage_milliseconds"][1].append(("_sum", stage_label, round(total, 2)))
+                families["stage_milliseconds"][1].append(("_count", stage_label, count))
+        for route, count in self.requests.items():
+            families["http_requests_total"][1].append(("", f'route="{route}"', count))
+
+        lines = []
+        for name, (metric_type, samples) in families.items():
+            lines.append(f"# TYPE {API_NAME}_{name} {metric_type}")
+            for suffix, labels, value in samples:
+                lines.append(f"{API_NAME}_{name}{suffix}{{{labels}}} {value}")
+        return "\n".join(lines) + "\n"
+
+    async def serve(self, host=DAEMON_HOST, port=DAEMON_PORT):
+        """Start refreshing and serving until cancelled."""
+        app = web.Application()
+        app.router.add_get("/", self.handle_index)
+        app.router.add_get("/metrics", self.handle_metrics)
+        app.router.add_get("/{slug}.json", self.handle_json)
+        app.router.add_get("/{slug}.png", self.handle_png)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        _LOGGER.info(f"Serving {len(self.clients)} locations on http://{host}:{port}/")
+        tasks = [asyncio.create_task(self.refresh_loop(slug)) for slug in self.clients]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await runner.cleanup()
+
+
+PROFILE_TOP = 25
+PROFILE_FRAMES = 10
+
+
+def format_stage_table(summary: dict) -> str:
+    """Plain text table of StageTimings.summary()."""
+    header = ["stage", "count", "p50 ms", "p90 ms", "p99 ms", "max ms"]
+    rows = [
+        [stage, values["count"], values["p50"], values["p90"], values["p99"], values["max"]]
+        for stage, values in summary.items()
+    ]
+    widths = [max(len(str(row[i])) for row in [header] + rows) for i in range(len(header))]
+    lines = [
+        "  ".join(
+            str(value).ljust(width) if i == 0 else str(value).rjust(width)
+            for i, (value, width) in enumerate(zip(row, widths))
+        )
+        for row in [header] + rows
+    ]
+    lines.insert(1, "-" * len(lines[0]))
+    return "\n".join(lines)
+
+
+async def profile_cycles(controller, cycles, output_dir=CONST_DIR_TEMP, refetch=False):
+    """Run full update cycles under cProfile and tracemalloc and write reports.
+
+    Writes profile.pstats, profile_cpu.txt and profile_alloc.txt to output_dir
+    and prints the stage timings of the cycles.
+    """
+    import cProfile
+    import pstats
+    import tracemalloc
+
+    api = controller.api
+    profiler = cProfile.Profile()
+
+    async def run_inline(target, *args):
+        return target(*args)
+
+    # cProfile only sees the thread it runs on, keep rendering off the executor
+    executor_job, api.executor_job = api.executor_job, run_inline
+    cycle_times = []
+    tracemalloc.start(PROFILE_FRAMES)
+    try:
+        for cycle in range(cycles):
+            if refetch:
+                api.expires = None
+            # Replay the payload through parse and render as if it was new data
+            api.generation += 1
+            start = timer.perf_counter()
+            profiler.enable()
+            try:
+                await controller.async_update()
+            finally:
+                profiler.disable()
+            cycle_times.append(round((timer.perf_counter() - start) * 1000, 2))
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        api.executor_job = executor_job
+    snapshot = snapshot.filter_traces(
+        [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ]
+    )
+
+    os.makedirs(output_dir, exist_ok=True)
+    file_pstats = os.path.join(output_dir, "profile.pstats")
+    file_cpu = os.path.join(output_dir, "profile_cpu.txt")
+    file_alloc = os.path.join(output_dir, "profile_alloc.txt")
+    profiler.dump_stats(file_pstats)
+    with open(file_cpu, "w") as file:
+        stats = pstats.Stats(profiler, stream=file).strip_dirs()
+        stats.sort_stats("cumulative").print_stats(PROFILE_TOP)
+        stats.sort_stats("tottime").print_stats(PROFILE_TOP)
+    allocations = snapshot.statistics("lineno")
+    with open(file_alloc, "w") as file:
+        file.write(f"Peak traced memory: {peak / 2 ** 20:.1f} MiB\n\n")
+        for stat in allocations[:PROFILE_TOP]:
+            file.write(f"{stat}\n")
+        file.write("\nLargest allocation sites with traceback:\n")
+        for stat in snapshot.statistics("traceback")[:5]:
+            file.write(f"\n{stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+            file.write("\n".join(stat.traceback.format(most_recent_first=True)) + "\n")
+
+    print(f"Profiled {cycles} cycles, p50 {get_percentile(sorted(cycle_times), 50)} ms "
+          f"max {max(cycle_times)} ms, peak traced memory {peak / 2 ** 20:.1f} MiB")
+    print(format_stage_table(api.timings.summary()))
+    print("\nTop allocation sites:")
+    for stat in allocations[:5]:
+        print(f"  {stat}")
+    print(f"\nReports: {file_pstats} {file_cpu} {file_alloc}")
+
+
+BATCH_CONCURRENCY = 4
+BATCH_RATE = 10
+BATCH_FIELDS = ["place", "latitude", "longitude", "expires", "error"] + list(CONST_WEATHERDATA)
+
+
+def read_batch_csv(filename):
+    """Yield locations of a csv with place, latitude, longitude and optional altitude."""
+    with open(filename, "r", newline="") as file:
+        for line, row in enumerate(csv.DictReader(file), start=2):
+            try:
+                yield {
+                    "place": row.get("place") or f"{row['latitude']},{row['longitude']}",
+                    "latitude": float(row["latitude"]),
+                    "longitude": float(row["longitude"]),
+                    "altitude": int(float(row.get("altitude") or 0)),
+                }
+            except (KeyError, TypeError, ValueError) as e:
+                _LOGGER.warning(f"Skipping line {line} of {filename}: {e!r}")
+
+
+class RateLimiter:
+    """Space out calls to at most rate per second, no limit if rate is 0."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self._next = 0
+
+    async def wait(self):
+        if not self.interval:
+            return
+        now = asyncio.get_running_loop().time()
+        start = max(now, self._next)
+        self._next = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+class BatchWriter:
+    """Write batch results as ndjson lines or csv rows of the current forecast."""
+
+    def __init__(self, file, format="ndjson", fields=BATCH_FIELDS):
+        self.file = file
+        self.format = format
+        self.count = 0
+        self.errors = 0
+        self._csv = None
+        if format == "csv":
+            self._csv = csv.DictWriter(file, fields, extrasaction="ignore")
+            self._csv.writeheader()
+
+    def write(self, record: dict):
+        self.count += 1
+        if record.get("error") is not None:
+            self.errors += 1
+        if self._csv is not None:
+            self._csv.writerow(record)
+        else:
+            self.file.write(json.dumps(record, default=str) + "\n")
+
+
+class BatchRunner:
+    """Forecasts for many locations through one session in a staged pipeline.
+
+    Fetch workers, limited by concurrency and rate, hand payloads over a
+    bounded queue to processing workers. These parse, derive and render in a
+    thread pool with one thread per cpu, each thread running process_data on
+    an event loop of its own, so the main loop keeps fetching while locations
+    are processed. Results go to the writer as they finish and are not kept.
+    """
+
+    def __init__(
+        self,
+        session,
+        writer: BatchWriter,
+        concurrency=BATCH_CONCURRENCY,
+        rate=BATCH_RATE,
+        base_url=API_BASE_URL,
+        image_dir=None,
+        render_pool=None,
+    ):
+        self.session = session
+        self.writer = writer
+        self.concurrency = max(1, concurrency)
+        self.processors = max(1, os.cpu_count() or 1)
+        self.limiter = RateLimiter(rate)
+        self.base_url = base_url
+        self.image_dir = image_dir
+        self.render_pool = render_pool
+        self.timings = StageTimings()
+        self._thread = threading.local()
+        self._thread_loops = []
+
+    def create_client(self, location):
+        client = NorwegianWeatherApiClient(
+            location["place"],
+            location["latitude"],
+            location["longitude"],
+            self.session,
+            altitude=location.get("altitude", 0),
+            output_dir=self.image_dir or CONST_DIR_DEFAULT,
+            save_image=self.image_dir is not None,
+            base_url=self.base_url,
+        )
+        client.demand_image = self.image_dir is not None
+        client.demand_timeseries = self.writer.format != "csv"
+        client.render_pool = self.render_pool
+        # One client per location, share the timings of the whole batch
+        client.timings = self.timings
+        return client
+
+    def get_record(self, client, error=None) -> dict:
+        record = dict(client.data)
+        record.update(
+            {
+                "place": client.location.name,
+                "latitude": client.location.latitude,
+                "longitude": client.location.longitude,
+                "expires": client.expires,
+                "error": error,
+            }
+        )
+        return record
+
+    async def fetch_worker(self, locations, processing: asyncio.Queue):
+        for location in locations:
+            client = self.create_client(location)
+            await self.limiter.wait()
+            try:
+                await client.async_fetch()
+                error = None if validate_payload(client.yrdata) else "no data"
+            except Exception as e:  # pylint: disable=broad-except
+                error = repr(e)
+            await processing.put((client, error))
+
+    def start_thread(self):
+        """Create the event loop of a processing thread, kept for the run."""
+        self._thread.loop = asyncio.new_event_loop()
+        self._thread_loops.append(self._thread.loop)
+
+    def process(self, client):
+        """Parse, derive and render one location, on a thread of the pool."""
+
+        async def run_inline(target, *args):
+            return target(*args)
+
+        # Already off the main loop, render on this thread as well
+        client.executor_job = run_inline
+        self._thread.loop.run_until_complete(client.process_data())
+
+    async def process_worker(self, processing: asyncio.Queue, writing: asyncio.Queue, executor):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await processing.get()
+            if item is None:
+                return
+            client, error = item
+            if error is None:
+                try:
+                    await loop.run_in_executor(executor, self.process, client)
+                except Exception as e:  # pylint: disable=broad-except
+                    error = repr(e)
+            await writing.put(self.get_record(client, error))
+
+    async def write_worker(self, writing: asyncio.Queue):
+        while True:
+            record = await writing.get()
+            if record is None:
+                return
+            self.writer.write(record)
+
+    async def run(self, locations):
+        """Fetch, process and write all locations."""
+        if self.image_dir is not None:
+            os.makedirs(self.image_dir, exist_ok=True)
+        locations = iter(locations)
+        processing = asyncio.Queue(maxsize=self.concurrency * 2)
+        writing = asyncio.Queue(maxsize=self.concurrency * 2)
+        executor = concurrent.futures.ThreadPoolExecutor(
+            self.processors, thread_name_prefix="batch", initializer=self.start_thread
+        )
+        processors = [
+            asyncio.create_task(self.process_worker(processing, writing, executor))
+            for _ in range(self.processors)
+        ]
+        writer = asyncio.create_task(self.write_worker(writing))
+
+        async def feed():
+            # Workers share the iterator, each location is taken once
+            await asyncio.gather(
+                *[self.fetch_worker(locations, processing) for _ in range(self.concurrency)]
+            )
+            for _ in processors:
+                await processing.put(None)
+            await asyncio.gather(*processors)
+            await writing.put(None)
+
+        tasks = [asyncio.create_task(feed()), writer] + processors
+        try:
+            with self.timings.span("batch"):
+                # A failing stage, e.g. a closed output, stops the others
+                await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Locations being processed finish, queued ones are dropped
+            executor.shutdown(wait=True, cancel_futures=True)
+            while self._thread_loops:
+                self._thread_loops.pop().close()
+
+
+async def run_batch(args):
+    """Run --batch from the command line."""
+    output = args.output or "-"
+    output_format = args.format or ("csv" if output.endswith(".csv") else "ndjson")
+    connector = aiohttp.TCPConnector(limit=max(1, args.concurrency))
+    if output == "-":
+        file = sys.stdout
+    else:
+        file = open(output, "w", newline="")
+    # Only used for the images of --image-dir
+    render_pool = create_render_pool(args) if args.image_dir is not None else None
+    try:
+        async with aiohttp.ClientSession(
+            connector=connector, trace_configs=[timing_trace_config()]
+        ) as session:
+            writer = BatchWriter(file, output_format)
+            runner = BatchRunner(
+                session,
+                writer,
+                concurrency=args.concurrency,
+                rate=args.rate,
+                base_url=args.base_url,
+                image_dir=args.image_dir,
+                render_pool=render_pool,
+            )
+            await runner.run(read_batch_csv(args.batch))
+    finally:
+        if render_pool is not None:
+            render_pool.close()
+        if file is not sys.stdout:
+            file.close()
+    seconds = runner.timings.last.get("batch", 0) / 1000
+    print(
+        f"Batch of {writer.count} locations, {writer.errors} errors in {seconds:.1f} s",
+        file=sys.stderr,
+    )
+    print(format_stage_table(runner.timings.summary()), file=sys.stderr)
+
+
+def iter_archive(path):
+    """Yield filename and payload of recorded api responses in name order."""
+    if os.path.isdir(path):
+        filenames = sorted(
+            os.path.join(path, name)
+            for name in os.listdir(path)
+            if name.endswith((".json", ".json.gz"))
+        )
+    else:
+        filenames = [path]
+    for filename in filenames:
+        opener = gzip.open if filename.endswith(".gz") else open
+        try:
+            with opener(filename, "rt", encoding="utf-8") as file:
+                payload = json.load(file)
+        except (OSError, ValueError) as e:
+            _LOGGER.warning(f"Skipping {filename}: {e!r}")
+            continue
+        yield filename, payload
+
+
+def get_payload_time(payload) -> Optional[dt.datetime]:
+    """Time the payload was produced, the clock of a replay."""
+    props = payload.get("properties", {})
+    updated_at = props.get("meta", {}).get("updated_at", None)
+    if updated_at is None and props.get("timeseries"):
+        updated_at = props["timeseries"][0].get("time", None)
+    return dt_parse_datetime(updated_at) if updated_at is not None else None
+
+
+class ArchiveReplay:
+    """Feed recorded payloads through processing and rendering without network.
+
+    Every payload is handled as new data of the location in its geometry, at
+    the time it was produced, so output only depends on the archive.
+    """
+
+    def __init__(self, writer: BatchWriter = None, image_dir=None):
+        self.writer = writer
+        self.image_dir = image_dir
+        self.clients = {}
+        self.count = 0
+        self.errors = 0
+        self.timings = StageTimings()
+
+    def get_client(self, payload):
+        longitude, latitude, *altitude = payload["geometry"]["coordinates"]
+        key = (latitude, longitude)
+        client = self.clients.get(key, None)
+        if client is None:
+            client = self.clients[key] = NorwegianWeatherApiClient(
+                f"{latitude}_{longitude}",
+                latitude,
+                longitude,
+                None,
+                altitude=altitude[0] if altitude else 0,
+                output_dir=self.image_dir or CONST_DIR_DEFAULT,
+                save_image=False,
+            )
+            client.demand_timeseries = self.writer is not None
+            client.timings = self.timings
+        return client
+
+    async def replay(self, filename, payload):
+        if not validate_payload(payload):
+            raise ValueError("not a locationforecast payload")
+        now = get_payload_time(payload)
+        if now is None:
+            raise ValueError("payload has no time")
+        client = self.get_client(payload)
+        client.set_cache({"yrdata": payload})
+        set_simulated_now(now)
+        try:
+            with self.timings.span("replay"):
+                await client.process_data()
+        finally:
+            set_simulated_now(None)
+        if client.image is not None and self.image_dir is not None:
+            # One image per payload instead of the latest per location
+            name = os.path.basename(filename).split(".")[0]
+            client.persist_image(os.path.join(self.image_dir, f"{name}.png"))
+        return client
+
+    async def run(self, archive):
+        if self.image_dir is not None:
+            os.makedirs(self.image_dir, exist_ok=True)
+        for filename, payload in archive:
+            self.count += 1
+            clock = None
+            try:
+                # Only a locationforecast payload has a clock, e.g. not a list
+                clock = get_payload_time(payload) if validate_payload(payload) else None
+                client = await self.replay(filename, payload)
+                record = dict(client.data)
+                error = None
+            except Exception as e:  # pylint: disable=broad-except
+                _LOGGER.warning(f"Replay of {filename} failed: {e!r}")
+                self.errors += 1
+                record, error = {}, repr(e)
+            if self.writer is not None:
+                record.update({"file": filename, "clock": clock, "error": error})
+                self.writer.write(record)
+
+
+async def run_replay(args):
+    """Run --replay from the command line."""
+    writer = None
+    file = None
+    if args.output is not None:
+        output_format = args.format or ("csv" if args.output.endswith(".csv") else "ndjson")
+        file = sys.stdout if args.output == "-" else open(args.output, "w", newline="")
+        writer = BatchWriter(file, output_format, ["file", "clock"] + BATCH_FIELDS)
+    replay = ArchiveReplay(writer, image_dir=args.image_dir)
+    start = timer.perf_counter()
+    try:
+        await replay.run(iter_archive(args.replay))
+    finally:
+        if file is not None and file is not sys.stdout:
+            file.close()
+    seconds = timer.perf_counter() - start
+    print(
+        f"Replayed {replay.count} payloads, {replay.errors} errors in {seconds:.2f} s "
+        f"({replay.count / seconds if seconds else 0:.1f} per second)",
+        file=sys.stderr,
+    )
+    print(format_stage_table(replay.timings.summary()), file=sys.stderr)
+
+
 async def main():
     """Main function when runing API separately."""
     args = parse_arguments()
     _LOGGER.debug("args: %s", args)
-    session = aiohttp.ClientSession()
+    if args.batch is not None:
+        await run_batch(args)
+        return
+    if args.replay is not None:
+        await run_replay(args)
+        return
+    session = aiohttp.ClientSession(trace_configs=[timing_trace_config()])
+    if args.daemon:
+        if args.locations is not None:
+            locations = read_locations(args.locations)
+        else:
+            locations = [
+                {"place": args.place, "latitude": args.latitude, "longitude": args.longitude}
+            ]
+        render_pool = create_render_pool(args)
+        try:
+            daemon = ForecastDaemon(
+                session, locations, base_url=args.base_url, render_pool=render_pool
+            )
+            await daemon.serve(args.host, args.port)
+        finally:
+            if render_pool is not None:
+                render_pool.close(wait=False)
+            await session.close()
+        return
+
     controller = MetController(
         latitude=args.latitude,
         longitude=args.longitude,
         place=args.place,
         session=session,
+        base_url=args.base_url,
     )
+    render_pool = create_render_pool(args)
+    controller.api.render_pool = render_pool
     # data = await controller.async_update()
-    if args.loop:
-        while True:
+    try:
+        if args.profile:
+            await profile_cycles(controller, args.profile, refetch=args.refetch)
+            controller.writeconfig()
+            await session.close()
+            return
+        if args.loop:
+            while True:
+                data = await controller.async_update()
+                # print(data)
+                print(f"Memory usage: {memory_usage_psutil()}")
+                print(f"Figures: {[plt.figure(i) for i in plt.get_fignums()]}")
+                await asyncio.sleep(10)
+        else:
             data = await controller.async_update()
-            # print(data)
-            print(f"Memory usage: {memory_usage_psutil()}")
-            print(f"Figures: {[plt.figure(i) for i in plt.get_fignums()]}")
-            await asyncio.sleep(10)
-    else:
-        data = await controller.async_update()
+    finally:
+        if render_pool is not None:
+            render_pool.close()
 
     print(data)
 
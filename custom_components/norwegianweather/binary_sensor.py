@@ -14,6 +14,7 @@ _LOGGER: logging.Logger = logging.getLogger(__package__)
 async def async_setup_entry(hass, entry, async_add_devices):
     """Setup sensor platform."""
     coordinator = hass.data[DOMAIN][entry.entry_id]
+    coordinator.register_platform(BINARY_SENSOR, async_add_devices)
     entities = coordinator.get_binary_sensor_entities()
     _LOGGER.debug(
         f"Setting up binary sensor platform for {coordinator.place}, {len(entities)} entities"
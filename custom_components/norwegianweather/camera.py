@@ -5,9 +5,7 @@ import logging
 from datetime import timedelta
 import io
 from typing import Callable, List
-import mimetypes
 import os
-import aiofiles
 
 # import voluptuous as vol
 
@@ -21,6 +19,7 @@ from .entity import NorwegianWeatherEntity
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 
 from .const import (
+    CAMERA,
     CONF_STRINGTIME,
     DOMAIN,
     DOMAIN,
@@ -29,6 +28,7 @@ from .const import (
     VERSION,
     ATTRIBUTION,
     CONST_DIR_DEFAULT,
+    IMAGE_VIEW_URL,
 )
 
 SCAN_INTERVAL = timedelta(seconds=120)
@@ -37,6 +37,7 @@ SCAN_INTERVAL = timedelta(seconds=120)
 async def async_setup_entry(hass, entry, async_add_devices):
     """Setup sensor platform."""
     coordinator = hass.data[DOMAIN][entry.entry_id]
+    coordinator.register_platform(CAMERA, async_add_devices)
     entities = coordinator.get_camera_entities()
     _LOGGER.debug(
         f"Setting up camera platform for {coordinator.place}, {len(entities)} entities"
@@ -84,16 +85,19 @@ class NorwegianWeatherCam(Camera, NorwegianWeatherEntity):
         # CONST_DIR_DEFAULT = os.path.join(CONST_DIR_THIS, "tmp")
         # file_path = os.path.join(CONST_DIR_DEFAULT, "norwegianweather.png")
         self.coordinator  = coordinator
-        file_path = os.path.join(CONST_DIR_DEFAULT, self.coordinator.api.file_image)
+        # The forecast strip, or the chart for the plot camera
+        self._kind = "plot" if state_key == "plot" else None
+        file_name = self.coordinator.api.file_image
+        if self._kind == "plot":
+            file_name = self.coordinator.api.file_plot
+        file_path = os.path.join(CONST_DIR_DEFAULT, file_name)
 
         self._name = name
-        self.check_file_path_access(file_path)
         self._file_path = file_path
         self._image = None
-        # Set content type of local file
-        content, _ = mimetypes.guess_type(file_path)
-        if content is not None:
-            self.content_type = content
+        self._image_hash = None
+        # Image bytes are handed over in memory from the coordinator
+        self.content_type = self.coordinator.get_content_type(self._kind)
 
     @property
     def brand(self):
@@ -118,7 +122,7 @@ class NorwegianWeatherCam(Camera, NorwegianWeatherEntity):
     ) -> bytes | None:
         # def camera_image(self) -> bytes | None:
         """Return image response."""
-        _LOGGER.debug("Updating camera image.")
+        _LOGGER.debug(f"Updating camera image, size {width}x{height}.")
         # try:
         #     # with open(self._file_path, "rb") as file:
         #     async with aiofiles.open(self._file_path, "rb") as file:
@@ -130,7 +134,14 @@ class NorwegianWeatherCam(Camera, NorwegianWeatherEntity):
         #         self._file_path,
         #     )
         # return None
-        return self._image
+        if self._image is None:
+            return None
+        if width is None and height is None and self.content_type == "image/png":
+            return self._image
+        # Thumbnails and other formats are made in the executor and cached
+        return await self.coordinator.async_get_image(
+            width, height, (self._image, self._image_hash)
+        )
 
     def check_file_path_access(self, file_path):
         """Check that filepath given is readable."""
@@ -154,20 +165,26 @@ class NorwegianWeatherCam(Camera, NorwegianWeatherEntity):
     @property
     def extra_state_attributes(self):
         """Return the camera state attributes."""
-        return {"file_path": self._file_path}
+        return {
+            "file_path": self._file_path if self.coordinator.api.save_image else None,
+            "image_hash": self._image_hash,
+            "image_url": self.get_image_url(),
+            "image_pages": (
+                self.coordinator.api.get_image_page_count() if self._kind is None else 1
+            ),
+        }
+
+    def get_image_url(self):
+        url = IMAGE_VIEW_URL.format(entry_id=self.coordinator.entry.entry_id)
+        if self._kind is not None:
+            url += f"?kind={self._kind}"
+        return url
 
     async def async_update(self):
         """ Properties should always only return information from memory and not do I/O (like network requests). Implement update() or async_update() to fetch data. """
-        _LOGGER.debug(f"Updating camera image from file {self._file_path}")
-        try:
-            # with open(self._file_path, "rb") as file:
-            async with aiofiles.open(self._file_path, "rb") as file:
-                self._image = await file.read()
-        except FileNotFoundError:
-            _LOGGER.warning(
-                "Could not read camera %s image from file: %s",
-                self._name,
-                self._file_path,
-            )
-            self._image = None
+        image, image_hash = self.coordinator.get_image(self._kind)
+        self.content_type = self.coordinator.get_content_type(self._kind)
+        if image_hash != self._image_hash:
+            _LOGGER.debug(f"Updating camera image {image_hash}")
+            self._image, self._image_hash = image, image_hash
 
@@ -2,17 +2,32 @@
 import logging
 from homeassistant import config_entries
 from homeassistant.core import callback
-from homeassistant.helpers.aiohttp_client import async_create_clientsession
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
 from homeassistant.const import CONF_MONITORED_CONDITIONS
 from homeassistant.helpers import config_validation as cv
 import voluptuous as vol
 
-from .api import NorwegianWeatherApiClient
+from .api import (
+    API_BASE_URL,
+    CONST_IMAGE_FORMATS,
+    CONST_IMAGE_HORIZON_MAX,
+    CONST_IMAGE_PAGE_SIZE,
+    CONST_PNG_PROFILES,
+    NorwegianWeatherApiClient,
+)
 from .const import (
+    CONF_BASE_URL,
+    CONF_IMAGE_BACKEND,
+    CONF_IMAGE_FORMAT,
+    CONF_IMAGE_HORIZON,
+    CONF_IMAGE_PROFILE,
     CONF_LAT,
     CONF_LONG,
     CONF_PLACE,
+    CONF_SAVE_IMAGE,
+    DEFAULT_ENTITIES,
     DOMAIN,
+    DOMAIN_PROBES,
     ENTITIES,
     PLATFORMS,
 )
@@ -29,6 +44,8 @@ class NorwegianWeatherFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
     def __init__(self):
         """Initialize."""
         self._errors = {}
+        # Location key and payload of the last successful probe
+        self._probe = None
 
     async def async_step_user(self, user_input=None):
         """Handle a flow initialized by the user."""
@@ -45,6 +62,9 @@ class NorwegianWeatherFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
                 user_input[CONF_LONG],
             )
             if valid:
+                # Hand the fetched payload over to the first refresh of the new entry
+                key, payload = self._probe
+                self.hass.data.setdefault(DOMAIN_PROBES, {})[key] = payload
                 entry = self.async_create_entry(
                     title=user_input[CONF_PLACE], data=user_input
                 )
@@ -92,15 +112,24 @@ class NorwegianWeatherFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
         """Return true if credentials is valid."""
         try:
             _LOGGER.debug("Checking credentials.")
-            session = async_create_clientsession(self.hass)
+            session = async_get_clientsession(self.hass)
             client = NorwegianWeatherApiClient(place, latitude, longitude, session)
-            await client.async_get_data()
+            if not await client.async_probe():
+                return False
+            self._probe = (client.location.key(), client.get_cache())
             return True
         except Exception as e:  # pylint: disable=broad-except
             _LOGGER.error(f"Failed during testing of credentials: {e}")
             # pass
         return False
 
+    @callback
+    def async_remove(self):
+        """Drop the payload of this flow if the new entry did not take it."""
+        if self._probe is not None:
+            self.hass.data.get(DOMAIN_PROBES, {}).pop(self._probe[0], None)
+            self._probe = None
+
     @staticmethod
     @callback
     def async_get_options_flow(config_entry):
@@ -131,9 +160,40 @@ class NorwegianWeatherOptionsFlowHandler(config_entries.OptionsFlow):
                     vol.Optional(
                         CONF_MONITORED_CONDITIONS,
                         default=self.config_entry.options.get(
-                            CONF_MONITORED_CONDITIONS, list(ENTITIES)
+                            CONF_MONITORED_CONDITIONS, DEFAULT_ENTITIES
                         ),
                     ): cv.multi_select(entity_multi_select),
+                    vol.Optional(
+                        CONF_SAVE_IMAGE,
+                        default=self.config_entry.options.get(CONF_SAVE_IMAGE, False),
+                    ): bool,
+                    vol.Optional(
+                        CONF_IMAGE_FORMAT,
+                        default=self.config_entry.options.get(CONF_IMAGE_FORMAT, "png"),
+                    ): vol.In(list(CONST_IMAGE_FORMATS)),
+                    vol.Optional(
+                        CONF_IMAGE_PROFILE,
+                        default=self.config_entry.options.get(
+                            CONF_IMAGE_PROFILE, "default"
+                        ),
+                    ): vol.In(list(CONST_PNG_PROFILES)),
+                    vol.Optional(
+                        CONF_IMAGE_BACKEND,
+                        default=self.config_entry.options.get(CONF_IMAGE_BACKEND, "png"),
+                    ): vol.In(["png", "svg"]),
+                    vol.Optional(
+                        CONF_IMAGE_HORIZON,
+                        default=self.config_entry.options.get(
+                            CONF_IMAGE_HORIZON, CONST_IMAGE_PAGE_SIZE
+                        ),
+                    ): vol.All(
+                        vol.Coerce(int),
+                        vol.Range(min=CONST_IMAGE_PAGE_SIZE, max=CONST_IMAGE_HORIZON_MAX),
+                    ),
+                    vol.Optional(
+                        CONF_BASE_URL,
+                        default=self.config_entry.options.get(CONF_BASE_URL, API_BASE_URL),
+                    ): cv.url,
                 }
             ),
             errors=errors,
@@ -5,6 +5,7 @@ from homeassistant.components.sensor import (
     SensorStateClass,
 )
 from homeassistant.const import (
+    EntityCategory,
     UnitOfTime,
     UnitOfTemperature,
     UnitOfPressure,
@@ -19,15 +20,34 @@ from homeassistant.const import (
 
 from .api import CONST_DIR_DEFAULT
 
+# Beaufort and the wind direction device class are missing in older Home
+# Assistant versions, those sensors then have a plain unit and no device class
+if hasattr(UnitOfSpeed, "BEAUFORT"):
+    UNIT_BEAUFORT = UnitOfSpeed.BEAUFORT
+    DEVICE_CLASS_BEAUFORT = SensorDeviceClass.WIND_SPEED
+else:
+    UNIT_BEAUFORT = "Beaufort"
+    DEVICE_CLASS_BEAUFORT = None
+DEVICE_CLASS_WIND_DIRECTION = getattr(SensorDeviceClass, "WIND_DIRECTION", None)
+
 # Base component constants
 NAME = "Norwegian Weather"
 DOMAIN = "norwegianweather"
 DOMAIN_DATA = f"{DOMAIN}_data"
+DOMAIN_PROBES = f"{DOMAIN}_probes"
+DOMAIN_RENDER = f"{DOMAIN}_render"
 VERSION = "0.2.2"
 ATTRIBUTION = "Data from MET Norway (www.met.no)"
 MANUFACTURER = f"{NAME}"
 ISSUE_URL = "https://github.com/tmjo/ha-norwegianweather/issues"
 
+# Http view serving the camera image with ETag
+IMAGE_VIEW_URL = f"/api/{DOMAIN}/image/{{entry_id}}"
+
+# Render workers shared by all locations
+RENDER_WORKERS = 2
+RENDER_QUEUE_SIZE = 16
+
 # Platforms
 BINARY_SENSOR = "binary_sensor"
 SENSOR = "sensor"
@@ -40,6 +60,12 @@ CONF_ENABLED = "enabled"
 CONF_PLACE = "place"
 CONF_LAT = "latitude"
 CONF_LONG = "longitude"
+CONF_SAVE_IMAGE = "save_image"
+CONF_IMAGE_FORMAT = "image_format"
+CONF_IMAGE_PROFILE = "image_profile"
+CONF_IMAGE_BACKEND = "image_backend"
+CONF_IMAGE_HORIZON = "image_horizon"
+CONF_BASE_URL = "base_url"
 CONF_STRINGTIME = "%d.%m %H:%M"
 
 # Defaults
@@ -124,10 +150,10 @@ ENTITIES = {
             "wind_speed_knot",
         ],
         # "units": None,
-        "units": UnitOfSpeed.BEAUFORT,
+        "units": UNIT_BEAUFORT,
         "convert_units_func": None,
         # "device_class": None,
-        "device_class": SensorDeviceClass.WIND_SPEED,
+        "device_class": DEVICE_CLASS_BEAUFORT,
         "state_class": SensorStateClass.MEASUREMENT,
         "icon": "mdi:weather-windy",
         "state_func": None,
@@ -144,7 +170,7 @@ ENTITIES = {
             "wind_speed_bf_desc",
             "wind_speed_knot",
         ],
-        "device_class": SensorDeviceClass.WIND_DIRECTION,
+        "device_class": DEVICE_CLASS_WIND_DIRECTION,
         "state_class": SensorStateClass.MEASUREMENT,
         "units": DEGREE,
         "convert_units_func": None,
@@ -282,6 +308,18 @@ ENTITIES = {
         "icon": "mdi:weather-lightning",
         "state_func": None,
     },
+    "weather_refresh_time": {
+        "type": "sensor",
+        "key": "refresh_time",
+        "attrs": ["timings"],
+        "units": UnitOfTime.MILLISECONDS,
+        "convert_units_func": "round_0_dec",
+        "device_class": SensorDeviceClass.DURATION,
+        "entity_category": EntityCategory.DIAGNOSTIC,
+        "icon": "mdi:timer-outline",
+        "state_func": None,
+        "default": False,
+    },
     "weather_cam": {
         "type": "camera",
         "key": "place",
@@ -292,4 +330,18 @@ ENTITIES = {
         "icon": "mdi:camera-enhance",
         "state_func": None,
     },
+    "weather_plot": {
+        "type": "camera",
+        "key": "plot",
+        "attrs": [],
+        "units": None,
+        "convert_units_func": None,
+        "device_class": None,
+        "icon": "mdi:chart-line",
+        "state_func": None,
+        "default": False,
+    },
 }
+
+# Entities enabled unless selected otherwise
+DEFAULT_ENTITIES = [key for key, data in ENTITIES.items() if data.get("default", True)]
@@ -10,22 +10,36 @@ import logging
 from homeassistant.const import CONF_MONITORED_CONDITIONS
 from homeassistant.config_entries import ConfigEntry
 # from homeassistant.core import Config, HomeAssistant
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 # from homeassistant.helpers.typing import ConfigType
 # from homeassistant.exceptions import ConfigEntryNotReady
 # from homeassistant.helpers.aiohttp_client import async_get_clientsession
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator #, UpdateFailed
 from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers import entity_registry as er
 from .entity import convert_units_funcs
-from .api import NorwegianWeatherApiClient
+from .api import (
+    API_BASE_URL,
+    CONST_IMAGE_PAGE_SIZE,
+    NorwegianWeatherApiClient,
+    get_image_format,
+)
+from .lifecycle import EntryLifecycle
 from .binary_sensor import NorwegianWeatherBinarySensor
 from .switch import NorwegianWeatherSwitch
 from .sensor import NorwegianWeatherSensor
 from .camera import NorwegianWeatherCam
 from .const import (
+    CONF_BASE_URL,
+    CONF_IMAGE_BACKEND,
+    CONF_IMAGE_FORMAT,
+    CONF_IMAGE_HORIZON,
+    CONF_IMAGE_PROFILE,
     CONF_LAT,
     CONF_LONG,
     CONF_PLACE,
+    CONF_SAVE_IMAGE,
+    DEFAULT_ENTITIES,
     DOMAIN,
     ENTITIES,
     PLATFORMS,
@@ -51,13 +65,25 @@ class NorwegianWeatherDataUpdateCoordinator(DataUpdateCoordinator):
         self.entry = entry  # ??
         self.place = entry.data.get(CONF_PLACE)
 
+        self.lifecycle = EntryLifecycle(hass, entry)
+        self.entity_ids = {}
+        self.entities = {}
         self.sensor_entities = []
         self.switch_entities = []
         self.binary_sensor_entities = []
         self.camera_entities = []
+        self._add_entities_funcs = {}
 
         super().__init__(hass, _LOGGER, name=DOMAIN, update_interval=API_SCAN_INTERVAL)
 
+        # Blocking work of the client is owned by the entry
+        self.api.executor_job = self.lifecycle.add_job
+        self.api.image_callback = self._image_published
+        self.api.save_image = self.get_save_image()
+        self.api.base_url = self.get_base_url()
+        self.apply_image_options()
+        self.lifecycle.add_shutdown(self._release)
+
     async def _async_update_data(self):
         """Update data via library."""
         _LOGGER.debug(f"Coordinator update.")
@@ -78,12 +104,34 @@ class NorwegianWeatherDataUpdateCoordinator(DataUpdateCoordinator):
     async def add_schedulers(self):
         """Add schedules to udpate data"""
         _LOGGER.debug(f"Adding schedulers.")
-        async_track_time_interval(
-            self.hass,
-            self.update_ha_state,
-            ENTITIES_SCAN_INTERVAL,
+        self.lifecycle.add_listener(
+            async_track_time_interval(
+                self.hass,
+                self.update_ha_state,
+                ENTITIES_SCAN_INTERVAL,
+            )
         )
 
+    async def _release(self):
+        """Drop entities and stop the refresh timer on teardown."""
+        if hasattr(self, "async_shutdown"):
+            await self.async_shutdown()
+        self.api.executor_job = None
+        self.api.image_callback = None
+        if self.api.render_queue is not None:
+            self.api.render_queue.cancel(self.api.location.key())
+            self.api.render_queue.cancel(self.api.location.key() + "/plot")
+        if self.api.weather_plot is not None:
+            self.api.weather_plot.close()
+            self.api.weather_plot = None
+        self.entities.clear()
+        self.entity_ids.clear()
+        self.sensor_entities.clear()
+        self.switch_entities.clear()
+        self.binary_sensor_entities.clear()
+        self.camera_entities.clear()
+        self._add_entities_funcs.clear()
+
     async def update_ha_state(self, now=None):
         # Internal update from API without external calls
         # self.data = self.api.process_data()
@@ -97,98 +145,238 @@ class NorwegianWeatherDataUpdateCoordinator(DataUpdateCoordinator):
         )
         _LOGGER.debug(f"Update HA state for {len(all_entities)} entities.")
         for entity in all_entities:
-            entity.async_schedule_update_ha_state(True)
+            # Entities are created before the first refresh, skip until added
+            if entity.hass is not None:
+                entity.async_schedule_update_ha_state(True)
+
+    def _image_published(self):
+        """Called from the render worker when a new image is available."""
+        self.hass.loop.call_soon_threadsafe(self._async_update_cameras)
+
+    @callback
+    def _async_update_cameras(self):
+        for entity in self.camera_entities:
+            if entity.hass is not None:
+                entity.async_schedule_update_ha_state(True)
+
+    def get_image(self, kind=None):
+        """Return the latest rendered image, or plot, bytes and their content hash."""
+        if kind == "plot":
+            return self.api.plot, self.api.plot_hash
+        return self.api.image, self.api.image_hash
+
+    async def async_get_image(self, width=None, height=None, source=None):
+        """Return the latest image, or source, resized in the executor, or None."""
+        if (source or self.get_image())[0] is None:
+            return None
+        return await self.lifecycle.add_job(
+            self.api.get_image_variant, width, height, source
+        )
+
+    def apply_image_options(self):
+        """Set image options from the entry, True if the image must be rendered again."""
+        self.api.image_format = get_image_format(
+            self.entry.options.get(CONF_IMAGE_FORMAT)
+        )
+        profile = self.entry.options.get(CONF_IMAGE_PROFILE, "default")
+        backend = self.entry.options.get(CONF_IMAGE_BACKEND, "png")
+        changed = (profile, backend) != (self.api.image_profile, self.api.image_backend)
+        self.api.image_profile = profile
+        self.api.image_backend = backend
+        self.api.image_horizon = self.entry.options.get(
+            CONF_IMAGE_HORIZON, CONST_IMAGE_PAGE_SIZE
+        )
+        return changed
+
+    def get_content_type(self, kind=None):
+        """Content type of the image, or plot, served to clients."""
+        if kind != "plot" and self.api.image_backend == "svg":
+            return "image/svg+xml"
+        return f"image/{self.api.image_format}"
+
+    async def async_get_image_page(self, page):
+        """Return bytes and hash of an image page, rendering it in the executor."""
+        if page == 0:
+            return self.get_image()
+        return await self.lifecycle.add_job(self.api.get_image_page, page)
+
+    def get_save_image(self):
+        """Whether the image is also written to file, off unless enabled in options."""
+        return self.entry.options.get(CONF_SAVE_IMAGE, False)
+
+    def get_base_url(self):
+        """Api base url, api.met.no unless a caching proxy is set in options."""
+        return self.entry.options.get(CONF_BASE_URL, API_BASE_URL)
+
+    def get_monitored_conditions(self):
+        """Get monitored conditions if defined in options, otherwise defaults."""
+        return [
+            key
+            for key in dict.fromkeys(
+                self.entry.options.get(CONF_MONITORED_CONDITIONS, DEFAULT_ENTITIES)
+            )
+            if key in ENTITIES
+        ]
+
+    def register_platform(self, platform, async_add_devices):
+        """Keep the add entities callback of a platform for later use."""
+        if platform not in self.platforms:
+            self.platforms.append(platform)
+        self._add_entities_funcs[platform] = async_add_devices
 
     def _create_entitites(self):
         _LOGGER.debug(f"Creating entities for {self.place}.")
+        for key in self.get_monitored_conditions():
+            self._create_entity(key)
+        self.update_demand()
 
-        # Get monitored conditions if defined in options, otherwise add all
-        monitored_conditions = list(
-            dict.fromkeys(self.entry.options.get(CONF_MONITORED_CONDITIONS, ENTITIES))
+    def update_demand(self):
+        """Tell the client which data the enabled entities consume."""
+        keys = set()
+        image = False
+        plot = False
+        for key in self.entities:
+            data = ENTITIES[key]
+            if data.get("type", "sensor") == "camera":
+                if data["key"] == "plot":
+                    plot = True
+                else:
+                    image = True
+            for data_key in [data["key"]] + data["attrs"]:
+                keys.add(data_key.split(".")[0])
+        timeseries = "timeseries" in keys
+        _LOGGER.debug(
+            f"Demand for {self.place}: {len(keys)} keys, image {image}, plot {plot}, timeseries {timeseries}."
         )
+        return self.api.set_demand(keys, image=image, timeseries=timeseries, plot=plot)
 
-        for key in monitored_conditions:
-            if key not in ENTITIES:
-                continue
-            # for key in ENTITIES:
-            data = ENTITIES[key]
-            entity_type = data.get("type", "sensor")
-
-            _LOGGER.debug(f"Adding {entity_type} entity: {key} for {self.place}")
-
-            if entity_type == "sensor":
-                self.sensor_entities.append(
-                    NorwegianWeatherSensor(
-                        coordinator=self,
-                        config_entry=self.entry,
-                        place=self.place,
-                        name=key,
-                        state_key=data["key"],
-                        units=data["units"],
-                        convert_units_func=convert_units_funcs.get(
-                            data["convert_units_func"], None
-                        ),
-                        attrs_keys=data["attrs"],
-                        device_class=data["device_class"],
-                        icon=data["icon"],
-                        state_func=data.get("state_func", None),
-                    )
-                )
-            elif entity_type == "switch":
-                self.switch_entities.append(
-                    NorwegianWeatherSwitch(
-                        coordinator=self,
-                        config_entry=self.entry,
-                        place=self.place,
-                        name=key,
-                        state_key=data["key"],
-                        units=data["units"],
-                        convert_units_func=convert_units_funcs.get(
-                            data["convert_units_func"], None
-                        ),
-                        attrs_keys=data["attrs"],
-                        device_class=data["device_class"],
-                        icon=data["icon"],
-                        state_func=data.get("state_func", None),
-                        switch_func=data.get("switch_func", None),
-                    )
-                )
-            elif entity_type == "binary_sensor":
-                self.binary_sensor_entities.append(
-                    NorwegianWeatherBinarySensor(
-                        coordinator=self,
-                        config_entry=self.entry,
-                        place=self.place,
-                        name=key,
-                        state_key=data["key"],
-                        units=data["units"],
-                        convert_units_func=convert_units_funcs.get(
-                            data["convert_units_func"], None
-                        ),
-                        attrs_keys=data["attrs"],
-                        device_class=data["device_class"],
-                        icon=data["icon"],
-                        state_func=data.get("state_func", None),
-                    )
-                )
-            elif entity_type == "camera":
-                self.camera_entities.append(
-                    NorwegianWeatherCam(
-                        coordinator=self,
-                        config_entry=self.entry,
-                        place=self.place,
-                        name=key,
-                        state_key=data["key"],
-                        units=data["units"],
-                        convert_units_func=convert_units_funcs.get(
-                            data["convert_units_func"], None
-                        ),
-                        attrs_keys=data["attrs"],
-                        device_class=data["device_class"],
-                        icon=data["icon"],
-                        state_func=data.get("state_func", None),
-                    )
-                )
+    def _get_entity_list(self, entity_type):
+        return {
+            "sensor": self.sensor_entities,
+            "switch": self.switch_entities,
+            "binary_sensor": self.binary_sensor_entities,
+            "camera": self.camera_entities,
+        }.get(entity_type, None)
+
+    def _create_entity(self, key):
+        data = ENTITIES[key]
+        entity_type = data.get("type", "sensor")
+
+        _LOGGER.debug(f"Adding {entity_type} entity: {key} for {self.place}")
+
+        if entity_type == "sensor":
+            entity = NorwegianWeatherSensor(
+                coordinator=self,
+                config_entry=self.entry,
+                place=self.place,
+                name=key,
+                state_key=data["key"],
+                units=data["units"],
+                convert_units_func=convert_units_funcs.get(
+                    data["convert_units_func"], None
+                ),
+                attrs_keys=data["attrs"],
+                device_class=data["device_class"],
+                icon=data["icon"],
+                state_func=data.get("state_func", None),
+                entity_category=data.get("entity_category", None),
+            )
+        elif entity_type == "switch":
+            entity = NorwegianWeatherSwitch(
+                coordinator=self,
+                config_entry=self.entry,
+                place=self.place,
+                name=key,
+                state_key=data["key"],
+                units=data["units"],
+                convert_units_func=convert_units_funcs.get(
+                    data["convert_units_func"], None
+                ),
+                attrs_keys=data["attrs"],
+                device_class=data["device_class"],
+                icon=data["icon"],
+                state_func=data.get("state_func", None),
+                switch_func=data.get("switch_func", None),
+            )
+        elif entity_type == "binary_sensor":
+            entity = NorwegianWeatherBinarySensor(
+                coordinator=self,
+                config_entry=self.entry,
+                place=self.place,
+                name=key,
+                state_key=data["key"],
+                units=data["units"],
+                convert_units_func=convert_units_funcs.get(
+                    data["convert_units_func"], None
+                ),
+                attrs_keys=data["attrs"],
+                device_class=data["device_class"],
+                icon=data["icon"],
+                state_func=data.get("state_func", None),
+            )
+        elif entity_type == "camera":
+            entity = NorwegianWeatherCam(
+                coordinator=self,
+                config_entry=self.entry,
+                place=self.place,
+                name=key,
+                state_key=data["key"],
+                units=data["units"],
+                convert_units_func=convert_units_funcs.get(
+                    data["convert_units_func"], None
+                ),
+                attrs_keys=data["attrs"],
+                device_class=data["device_class"],
+                icon=data["icon"],
+                state_func=data.get("state_func", None),
+            )
+        else:
+            return None
+
+        self.entities[key] = entity
+        self._get_entity_list(entity_type).append(entity)
+        return entity
+
+    async def async_update_options(self):
+        """Add or remove entities in place after the options changed."""
+        monitored_conditions = self.get_monitored_conditions()
+        removed = [key for key in self.entities if key not in monitored_conditions]
+        added = [key for key in monitored_conditions if key not in self.entities]
+        _LOGGER.debug(
+            f"Updating options for {self.place}, adding {added} removing {removed}."
+        )
+
+        save_image = self.get_save_image()
+        if save_image and not self.api.save_image:
+            # Write the current image now instead of waiting for new data
+            self.lifecycle.add_job(self.api.persist_image)
+        self.api.save_image = save_image
+        self.api.base_url = self.get_base_url()
+        rerender = self.apply_image_options()
+        if rerender:
+            self.api.invalidate_image()
+
+        registry = er.async_get(self.hass)
+        for key in removed:
+            entity = self.entities.pop(key)
+            self._get_entity_list(ENTITIES[key].get("type", "sensor")).remove(entity)
+            if entity.entity_id and registry.async_get(entity.entity_id):
+                # Removing the registry entry also removes the entity from HA
+                registry.async_remove(entity.entity_id)
+            elif entity.hass is not None:
+                await entity.async_remove(force_remove=True)
+
+        created = [self._create_entity(key) for key in added]
+        # New entities may need data that was skipped, process cached payload again
+        if (self.update_demand() or rerender) and self.api.yrdata is not None:
+            await self.api.process_data()
+            self.async_set_updated_data(self.api.data)
+
+        for key, entity in zip(added, created):
+            entity_type = ENTITIES[key].get("type", "sensor")
+            async_add_devices = self._add_entities_funcs.get(entity_type, None)
+            if async_add_devices is not None:
+                async_add_devices([entity])
 
     def get_binary_sensor_entities(self):
         return self.binary_sensor_entities
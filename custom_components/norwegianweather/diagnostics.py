@@ -0,0 +1,38 @@
+"""Diagnostics support for NorwegianWeather."""
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .api import COLUMN_TILES, WEATHER_ICONS, get_text_atlas_stats
+from .const import CONF_LAT, CONF_LONG, DOMAIN
+
+TO_REDACT = {CONF_LAT, CONF_LONG}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict:
+    """Return diagnostics for a config entry."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    api = coordinator.api
+    return {
+        "entry": {
+            "title": entry.title,
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "place": coordinator.place,
+        "last_update_success": coordinator.last_update_success,
+        "expires": str(api.expires),
+        "last_modified": str(api.last_modified),
+        "generation": api.generation,
+        "timings": api.timings.summary(),
+        "stages": api.stage_counters,
+        "lifecycle": coordinator.lifecycle.stats(),
+        "weather_icons": WEATHER_ICONS.stats(),
+        "text_atlas": get_text_atlas_stats(),
+        "column_tiles": COLUMN_TILES.stats(),
+        "image_variants": api.image_variants.stats(),
+        "render_queue": api.render_queue.stats() if api.render_queue else None,
+        "entities": dict(coordinator.entity_ids),
+    }
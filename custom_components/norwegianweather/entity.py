@@ -63,6 +63,7 @@ class NorwegianWeatherEntity(CoordinatorEntity):
         icon: str,
         state_func=None,
         switch_func=None,
+        entity_category=None,
     ):
         """Initialize the entity."""
         super().__init__(coordinator)
@@ -78,13 +79,19 @@ class NorwegianWeatherEntity(CoordinatorEntity):
         self._state_func = state_func
         self._state = None
         self._switch_func = switch_func
+        self._attr_entity_category = entity_category
 
     async def async_added_to_hass(self) -> None:
         """Entity created."""
         await super().async_added_to_hass()
-        self.hass.data[DOMAIN]["entities"].append({self._entity_name: self.entity_id})
+        self.coordinator.entity_ids[self._entity_name] = self.entity_id
         self.async_schedule_update_ha_state(force_refresh=True)
 
+    async def async_will_remove_from_hass(self) -> None:
+        """Entity removed."""
+        await super().async_will_remove_from_hass()
+        self.coordinator.entity_ids.pop(self._entity_name, None)
+
     @property
     def unique_id(self):
         """Return a unique ID to use for this entity."""
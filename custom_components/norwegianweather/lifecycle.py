@@ -0,0 +1,81 @@
+"""
+Resource bookkeeping for a NorwegianWeather config entry.
+
+"""
+import asyncio
+import logging
+from typing import Callable
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+class EntryLifecycle:
+    """Own listeners, executor jobs and cache references of one entry."""
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry):
+        """Initialize."""
+        self.hass = hass
+        self.entry_id = entry.entry_id
+        self.closed = False
+        self._listeners = []
+        self._jobs = set()
+        self._refs = []
+        self._shutdown_funcs = []
+
+    def add_listener(self, unsub: Callable) -> Callable:
+        """Keep the unsubscribe callable of a listener until teardown."""
+        self._listeners.append(unsub)
+        return unsub
+
+    def add_ref(self, container: dict, key):
+        """Pop container[key] on teardown."""
+        self._refs.append((container, key))
+
+    def add_shutdown(self, func: Callable):
+        """Call (or await) func on teardown."""
+        self._shutdown_funcs.append(func)
+
+    def add_job(self, target: Callable, *args) -> asyncio.Future:
+        """Run blocking work in the executor and track it until done."""
+        job = self.hass.async_add_executor_job(target, *args)
+        self._jobs.add(job)
+        job.add_done_callback(self._jobs.discard)
+        return job
+
+    def stats(self) -> dict:
+        """Return counts of resources currently owned."""
+        return {
+            "listeners": len(self._listeners),
+            "jobs": len(self._jobs),
+            "refs": len(self._refs),
+            "shutdown": len(self._shutdown_funcs),
+        }
+
+    async def async_teardown(self):
+        """Release everything owned by the entry."""
+        if self.closed:
+            return
+        self.closed = True
+        _LOGGER.debug(f"Releasing resources for {self.entry_id}: {self.stats()}")
+
+        while self._listeners:
+            unsub = self._listeners.pop()
+            unsub()
+
+        # Executor threads can not be interrupted, let running jobs finish
+        jobs = list(self._jobs)
+        if jobs:
+            await asyncio.gather(*jobs, return_exceptions=True)
+        self._jobs.clear()
+
+        while self._shutdown_funcs:
+            result = self._shutdown_funcs.pop()()
+            if asyncio.iscoroutine(result):
+                await result
+
+        while self._refs:
+            container, key = self._refs.pop()
+            container.pop(key, None)
@@ -0,0 +1,254 @@
+"""
+Caching reverse proxy for the MET Norway locationforecast api.
+
+Several installs on one site can share it by setting their api base url to
+the proxy, e.g. http://192.168.1.10:8766/weatherapi. Each coordinate is then
+fetched from api.met.no once per Expires period:
+
+    python proxy.py --host 0.0.0.0 --port 8766
+
+"""
+import argparse
+import asyncio
+import email.utils as eut
+import logging
+import socket
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import aiohttp
+from aiohttp import web
+
+try:
+    from .api import API_BASE_URL, API_NAME, API_USER_AGENT, TIMEOUT, parse_http_date
+except ImportError:
+    # Running as a script next to api.py
+    from api import API_BASE_URL, API_NAME, API_USER_AGENT, TIMEOUT, parse_http_date
+
+_LOGGER: logging.Logger = logging.getLogger(__package__ or API_NAME)
+
+PROXY_HOST = "127.0.0.1"
+PROXY_PORT = 8766
+PROXY_MAX_ENTRIES = 1024
+PROXY_PATH = "/weatherapi/locationforecast/2.0/{datatype}"
+PROXY_DATATYPES = ["compact", "complete", "classic"]
+
+
+def get_cache_key(datatype, query) -> tuple:
+    """Cache key of a forecast request, coordinates rounded to 4 decimals like the api."""
+    latitude = round(float(query["lat"]), 4)
+    longitude = round(float(query["lon"]), 4)
+    altitude = query.get("altitude", None)
+    if altitude is not None:
+        altitude = int(float(altitude))
+    return (datatype, latitude, longitude, altitude)
+
+
+class CachedForecast:
+    """Upstream response kept until it expires."""
+
+    def __init__(self, status, body, content_type, headers):
+        self.status = status
+        self.body = body
+        self.content_type = content_type
+        self.headers = headers
+        self.expires = parse_http_date(headers["Expires"]) if "Expires" in headers else None
+        self.last_modified = (
+            parse_http_date(headers["Last-Modified"])
+            if "Last-Modified" in headers
+            else None
+        )
+
+    def is_fresh(self):
+        return self.expires is not None and datetime.now(timezone.utc) < self.expires
+
+    def set_expires(self, text):
+        """Take a new Expires from a 304 revalidation."""
+        self.headers["Expires"] = text
+        self.expires = parse_http_date(text)
+
+
+class ForecastProxy:
+    """Serve forecasts from cache and fetch each coordinate once when it expires.
+
+    Concurrent requests for a key that has to be fetched wait for the same
+    upstream request. Stale entries are revalidated with If-Modified-Since and
+    served as they are if the upstream request fails.
+    """
+
+    def __init__(self, session, upstream=API_BASE_URL, max_entries=PROXY_MAX_ENTRIES):
+        self.session = session
+        self.upstream = upstream.rstrip("/")
+        self.max_entries = max_entries
+        self.cache = OrderedDict()
+        self._pending = {}
+        self.counters = {
+            "hits": 0,
+            "misses": 0,
+            "revalidations": 0,
+            "not_modified": 0,
+            "collapsed": 0,
+            "errors": 0,
+            "stale": 0,
+        }
+
+    def get_upstream_url(self, key):
+        datatype, latitude, longitude, altitude = key
+        url = f"{self.upstream}/locationforecast/2.0/{datatype}?lat={latitude}&lon={longitude}"
+        if altitude is not None:
+            url += f"&altitude={altitude}"
+        return url
+
+    async def get(self, key, user_agent=API_USER_AGENT) -> CachedForecast:
+        """Return the forecast of key, from cache while fresh, or None."""
+        entry = self.cache.get(key, None)
+        if entry is not None and entry.is_fresh():
+            self.counters["hits"] += 1
+            self.cache.move_to_end(key)
+            return entry
+
+        task = self._pending.get(key, None)
+        if task is not None:
+            self.counters["collapsed"] += 1
+        else:
+            self.counters["misses" if entry is None else "revalidations"] += 1
+            task = asyncio.ensure_future(self._fetch(key, entry, user_agent))
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        # A client giving up must not cancel the fetch others wait for
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key, entry, user_agent):
+        url = self.get_upstream_url(key)
+        headers = {"User-Agent": user_agent}
+        if entry is not None and entry.last_modified is not None:
+            headers["If-Modified-Since"] = eut.format_datetime(
+                entry.last_modified, usegmt=True
+            )
+        try:
+            async with self.session.get(
+                url, headers=headers, timeout=aiohttp.ClientTimeout(total=TIMEOUT)
+            ) as response:
+                if response.status == 304 and entry is not None:
+                    self.counters["not_modified"] += 1
+                    if "Expires" in response.headers:
+                        entry.set_expires(response.headers["Expires"])
+                    _LOGGER.debug(f"Upstream not modified for {key}, expires {entry.expires}.")
+                    self._store(key, entry)
+                    return entry
+                if response.status == 304:
+                    # Nothing cached to revalidate, there is no forecast to serve
+                    self.counters["errors"] += 1
+                    _LOGGER.warning(f"Upstream answered 304 for {key} without a cached copy.")
+                    return None
+                body = await response.read()
+                fetched = CachedForecast(
+                    response.status,
+                    body,
+                    response.content_type,
+                    {
+                        name: response.headers[name]
+                        for name in ("Expires", "Last-Modified")
+                        if name in response.headers
+                    },
+                )
+        except (asyncio.TimeoutError, aiohttp.ClientError, socket.gaierror) as e:
+            self.counters["errors"] += 1
+            _LOGGER.warning(f"Upstream request for {key} failed: {e!r}")
+            if entry is not None:
+                self.counters["stale"] += 1
+            return entry
+
+        _LOGGER.debug(f"Upstream response {fetched.status} for {key}, expires {fetched.expires}.")
+        if fetched.status != 200:
+            self.counters["errors"] += 1
+            if entry is not None:
+                # Throttling or an upstream error is not passed on to every client
+                self.counters["stale"] += 1
+                _LOGGER.warning(f"Upstream answered {fetched.status} for {key}, serving stale copy.")
+                return entry
+            return fetched
+        self._store(key, fetched)
+        return fetched
+
+    def _store(self, key, entry):
+        self.cache[key] = entry
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.max_entries:
+            self.cache.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {**self.counters, "entries": len(self.cache), "pending": len(self._pending)}
+
+    async def handle_forecast(self, request):
+        datatype = request.match_info["datatype"]
+        if datatype not in PROXY_DATATYPES:
+            raise web.HTTPNotFound()
+        try:
+            key = get_cache_key(datatype, request.query)
+        except (KeyError, ValueError):
+            raise web.HTTPBadRequest(text="lat and lon are required numbers")
+
+        entry = await self.get(key, request.headers.get("User-Agent", API_USER_AGENT))
+        if entry is None:
+            raise web.HTTPBadGateway()
+        if entry.status != 200:
+            return web.Response(
+                status=entry.status, body=entry.body, content_type=entry.content_type
+            )
+
+        since = request.headers.get("If-Modified-Since", None)
+        if since is not None and entry.last_modified is not None:
+            since = parse_http_date(since)
+            if since is not None and entry.last_modified <= since:
+                return web.Response(status=304, headers=entry.headers)
+        return web.Response(
+            body=entry.body, content_type=entry.content_type, headers=entry.headers
+        )
+
+    async def handle_stats(self, request):
+        return web.json_response(self.stats())
+
+    async def serve(self, host=PROXY_HOST, port=PROXY_PORT):
+        """Serve until cancelled."""
+        app = web.Application()
+        app.router.add_get(PROXY_PATH, self.handle_forecast)
+        app.router.add_get("/stats", self.handle_stats)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        _LOGGER.info(f"Proxying {self.upstream} on http://{host}:{port}/weatherapi")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+
+def parse_arguments():
+    """Argument parser for running the proxy."""
+    parser = argparse.ArgumentParser(description=f"{API_NAME} caching proxy")
+    parser.add_argument("--host", help="Http host", default=PROXY_HOST)
+    parser.add_argument("--port", help="Http port", default=PROXY_PORT, type=int)
+    parser.add_argument("--upstream", help="Upstream api base url", default=API_BASE_URL)
+    parser.add_argument(
+        "--max-entries", help="Cached coordinates", default=PROXY_MAX_ENTRIES, type=int
+    )
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_arguments()
+    async with aiohttp.ClientSession() as session:
+        proxy = ForecastProxy(session, args.upstream, args.max_entries)
+        await proxy.serve(args.host, args.port)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.DEBUG,
+        format="%(asctime)s %(levelname)s %(lineno)d:%(filename)s(%(process)d) - %(message)s",
+    )
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("Interrupted by user")
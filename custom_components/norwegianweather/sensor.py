@@ -1,6 +1,6 @@
 """Sensor platform for NorwegianWeather."""
 import logging
-from .const import DOMAIN
+from .const import DOMAIN, SENSOR
 from .entity import NorwegianWeatherEntity
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
@@ -9,6 +9,7 @@ _LOGGER: logging.Logger = logging.getLogger(__package__)
 async def async_setup_entry(hass, entry, async_add_devices):
     """Setup sensor platform."""
     coordinator = hass.data[DOMAIN][entry.entry_id]
+    coordinator.register_platform(SENSOR, async_add_devices)
     entities = coordinator.get_sensor_entities()
     _LOGGER.debug(
         f"Setting up sensor platform for {coordinator.place}, {len(entities)} entities"
@@ -1,7 +1,7 @@
 """Switch platform for NorwegianWeather."""
 from homeassistant.components.switch import SwitchEntity
 
-from .const import DOMAIN
+from .const import DOMAIN, SWITCH
 from .entity import NorwegianWeatherEntity
 import logging
 
@@ -11,6 +11,7 @@ _LOGGER: logging.Logger = logging.getLogger(__package__)
 async def async_setup_entry(hass, entry, async_add_devices):
     """Setup sensor platform."""
     coordinator = hass.data[DOMAIN][entry.entry_id]
+    coordinator.register_platform(SWITCH, async_add_devices)
     entities = coordinator.get_switch_entities()
     _LOGGER.debug(
         f"Setting up switch platform for {coordinator.place}, {len(entities)} entities"
@@ -0,0 +1,74 @@
+"""
+Http view serving NorwegianWeather camera images with conditional responses.
+
+"""
+from http import HTTPStatus
+import logging
+
+from aiohttp import hdrs, web
+
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, IMAGE_VIEW_URL
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+class NorwegianWeatherImageView(HomeAssistantView):
+    """Serve the image of an entry with an ETag from its content hash."""
+
+    url = IMAGE_VIEW_URL
+    name = f"api:{DOMAIN}:image"
+    requires_auth = True
+
+    def __init__(self, hass: HomeAssistant):
+        """Initialize."""
+        self.hass = hass
+
+    async def get(self, request: web.Request, entry_id: str) -> web.Response:
+        """Return the image, or 304 if the client already has it."""
+        coordinator = self.hass.data.get(DOMAIN, {}).get(entry_id, None)
+        if coordinator is None:
+            return web.Response(status=HTTPStatus.NOT_FOUND)
+        kind = request.query.get("kind", None)
+        page = get_dimension(request.query.get("page")) or 0
+        if kind is None and page:
+            # Later pages of the forecast are rendered on first request
+            image, image_hash = await coordinator.async_get_image_page(page)
+        else:
+            image, image_hash = coordinator.get_image(kind)
+        if image is None:
+            return web.Response(status=HTTPStatus.NOT_FOUND)
+
+        width = get_dimension(request.query.get("width"))
+        height = get_dimension(request.query.get("height"))
+        content_type = coordinator.get_content_type(kind)
+        etag = f'"{image_hash}-{width or 0}x{height or 0}-{content_type.split("/")[1]}"'
+        headers = {hdrs.ETAG: etag, hdrs.CACHE_CONTROL: "no-cache"}
+
+        if etag_matches(request.headers.get(hdrs.IF_NONE_MATCH), etag):
+            return web.Response(status=HTTPStatus.NOT_MODIFIED, headers=headers)
+
+        _LOGGER.debug(f"Serving image {etag} for {coordinator.place}.")
+        body = await coordinator.async_get_image(width, height, (image, image_hash))
+        return web.Response(
+            body=body, content_type=content_type, headers=headers
+        )
+
+
+def get_dimension(value):
+    """Return a positive number from a query value, otherwise None."""
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+
+def etag_matches(if_none_match, etag):
+    """Check an If-None-Match header against an ETag."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags